@@ -0,0 +1,107 @@
+"""
+Per-session account lookups for the accounts app.
+Nearly every view and the navigation bar need the user's role and owned
+restaurant. resolve_account() loads them with one query and keeps them in the
+session, so later requests read them from there (request.account, set by
+AccountMiddleware, and {{ account }} in templates).
+
+Each user has an account version, stored on their profile (account_version). The
+receivers in accounts/models.py and restaurants/models.py bump it when a profile or
+an owned restaurant changes, and a session holding an older version looks the
+account up again. Sessions on other devices and in other worker processes
+therefore pick up a role change on their next request.
+
+By default every request reads the version from the profile row (one primary key
+lookup). Setting ACCOUNT_VERSION_CACHE_ALIAS serves it from that cache instead,
+which must then be shared by every worker (e.g. Redis): with a per-process locmem
+cache, other workers would keep granting the old role.
+"""
+
+import time
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+
+SESSION_KEY = '_account'
+
+
+class RequestAccount:
+    """The role, profile id and owned restaurant id of the user making a request."""
+
+    def __init__(self, role=None, profile_id=None, restaurant_id=None):
+        self.role = role
+        self.profile_id = profile_id
+        self.restaurant_id = restaurant_id
+
+    @property
+    def is_restaurant_owner(self):
+        return self.role == 'restaurant_owner'
+
+    def __repr__(self):
+        return f'<RequestAccount role={self.role} profile={self.profile_id} restaurant={self.restaurant_id}>'
+
+
+def account_version_key(user_id):
+    return f'account_version:{user_id}'
+
+
+def get_account_version_cache():
+    """Return the shared cache holding account versions, or None to read them from the database."""
+    alias = getattr(settings, 'ACCOUNT_VERSION_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def _stored_account_version(user_id):
+    from .models import UserProfile
+
+    return UserProfile.objects.filter(user_id=user_id).values_list('account_version', flat=True).first()
+
+
+def get_account_version(user_id):
+    """Return the user's current account version, or None if they have no profile."""
+    cache = get_account_version_cache()
+    if cache is None:
+        return _stored_account_version(user_id)
+    key = account_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = _stored_account_version(user_id)
+        cache.add(key, version, None)
+    return version
+
+
+def bump_account_version(user_id):
+    """Make every session of a user look its account up again."""
+    from .models import UserProfile
+
+    # A fresh time.time_ns() rather than a counter: a full save of a stale profile
+    # writes an old version back, and must not make it current again.
+    version = time.time_ns()
+    UserProfile.objects.filter(user_id=user_id).update(account_version=version)
+    cache = get_account_version_cache()
+    if cache is not None:
+        transaction.on_commit(lambda: cache.set(account_version_key(user_id), version, None))
+
+
+def resolve_account(request):
+    """Return the RequestAccount of the request's user, from the session when it is current."""
+    user = request.user
+    if not user.is_authenticated:
+        return RequestAccount()
+
+    version = get_account_version(user.pk)
+    stored = request.session.get(SESSION_KEY)
+    if stored and stored['user_id'] == user.pk and stored['version'] == version:
+        return RequestAccount(stored['role'], stored['profile_id'], stored['restaurant_id'])
+
+    row = User.objects.filter(pk=user.pk).values('profile__role', 'profile__id', 'restaurant__id').first() or {}
+    account = RequestAccount(row.get('profile__role'), row.get('profile__id'), row.get('restaurant__id'))
+    request.session[SESSION_KEY] = {
+        'user_id': user.pk,
+        'version': version,
+        'role': account.role,
+        'profile_id': account.profile_id,
+        'restaurant_id': account.restaurant_id,
+    }
+    return account
@@ -0,0 +1,8 @@
+"""
+Template context processors for the accounts app.
+"""
+
+
+def account(request):
+    """Expose request.account as {{ account }} (role, profile_id, restaurant_id)."""
+    return {'account': getattr(request, 'account', None)}
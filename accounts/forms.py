@@ -32,12 +32,11 @@ class CustomUserCreationForm(UserCreationForm):
         user = super().save(commit=False)
         if commit:
             user.save()
-            # Create UserProfile
-            UserProfile.objects.create(
-                user=user,
-                phone_number=self.cleaned_data.get('phone_number'),
-                role=self.cleaned_data.get('role')
-            )
+            # Fill in the UserProfile created by the post_save signal
+            profile = user.profile
+            profile.phone_number = self.cleaned_data.get('phone_number')
+            profile.role = self.cleaned_data.get('role')
+            profile.save(update_fields=['phone_number', 'role', 'updated_at'])
         return user
 
 
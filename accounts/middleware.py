@@ -0,0 +1,17 @@
+"""
+Middleware for the accounts app.
+AccountMiddleware sets request.account to the user's role, profile id and owned
+restaurant id (see accounts/account_cache.py). It is resolved on first use, so
+requests that never look at it cost nothing.
+"""
+
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+from .account_cache import resolve_account
+
+
+class AccountMiddleware(MiddlewareMixin):
+    """Attach a lazily resolved RequestAccount to every request. Goes after AuthenticationMiddleware."""
+
+    def process_request(self, request):
+        request.account = SimpleLazyObject(lambda: resolve_account(request))
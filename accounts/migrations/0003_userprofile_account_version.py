@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_address_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='account_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
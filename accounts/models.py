@@ -6,8 +6,12 @@ Handles user registration, login, and different user roles.
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
+from foodcart.geo import geohash_encode, get_geocoder
+from foodcart.images import schedule_renditions
+from foodcart.storage import release_file, release_replaced_file, remember_replaced_file
+from .account_cache import bump_account_version
 
 # User roles
 USER_ROLE_CHOICES = (
@@ -28,12 +32,41 @@ class UserProfile(models.Model):
     city = models.CharField(max_length=100, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
     is_verified = models.BooleanField(default=False)
+    # Bumped when the role or owned restaurant changes (see account_cache.py)
+    account_version = models.BigIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username} - {self.get_role_display()}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_values()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_loaded_values()
+
+    def _remember_loaded_values(self):
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: field.get_prep_value(getattr(self, field.attname))
+            for field in self._meta.concrete_fields if field.attname not in deferred
+        }
+
+    def get_changed_fields(self):
+        """Names of the fields changed since the profile was loaded or saved; None if it never was."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        return [
+            field.name for field in self._meta.concrete_fields
+            if field.attname in loaded and field.get_prep_value(getattr(self, field.attname)) != loaded[field.attname]
+        ]
+
     class Meta:
         verbose_name_plural = "User Profiles"
 
@@ -53,6 +86,11 @@ class Address(models.Model):
     city = models.CharField(max_length=100)
     postal_code = models.CharField(max_length=10)
     is_default = models.BooleanField(default=False)
+    
+    # Location, geocoded from the address (see foodcart/geo.py)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -74,7 +112,79 @@ def create_user_profile(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     """
-    Signal handler to save the UserProfile when the User is saved.
+    Signal handler to save the UserProfile along with the User, if it was loaded on
+    the user and has been modified. Saves such as the last_login update on every
+    login neither load nor write the profile.
+    """
+    profile = instance._state.fields_cache.get('profile')
+    if profile is None:
+        return
+    changed = profile.get_changed_fields()
+    if changed is None:
+        profile.save()
+    elif changed:
+        profile.save(update_fields=changed + ['updated_at'])
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_account(sender, instance, **kwargs):
+    """
+    Signal handler to refresh the role cached in the user's sessions.
+    """
+    bump_account_version(instance.user_id)
+
+
+@receiver(post_save, sender=UserProfile)
+def render_profile_picture(sender, instance, update_fields=None, **kwargs):
+    """
+    Signal handler to generate resized renditions of a new profile picture.
+    """
+    if update_fields is None or 'profile_picture' in update_fields:
+        schedule_renditions(instance.profile_picture)
+
+
+@receiver(pre_save, sender=UserProfile)
+def remember_replaced_profile_picture(sender, instance, **kwargs):
+    """
+    Signal handler to note the stored profile picture a save replaces or clears.
+    """
+    remember_replaced_file(instance, 'profile_picture')
+
+
+@receiver(post_save, sender=UserProfile)
+def release_replaced_profile_picture(sender, instance, **kwargs):
+    """
+    Signal handler to release a replaced profile picture from content-addressed storage.
+    """
+    release_replaced_file(instance, 'profile_picture')
+
+
+@receiver(post_delete, sender=UserProfile)
+def release_deleted_profile_picture(sender, instance, **kwargs):
+    """
+    Signal handler to release the profile picture of a deleted profile.
+    """
+    release_file(instance.profile_picture)
+
+
+@receiver(pre_save, sender=Address)
+def geocode_address(sender, instance, **kwargs):
+    """
+    Signal handler to geocode new or edited addresses for nearby restaurant search.
     """
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
\ No newline at end of file
+    location = (instance.street_address, instance.city, instance.postal_code)
+    previous = None
+    if instance.pk:
+        previous = Address.objects.filter(pk=instance.pk).values_list('street_address', 'city', 'postal_code').first()
+    moved = previous != location
+    if moved or instance.latitude is None:
+        point = get_geocoder().geocode(instance.street_address, instance.city, instance.postal_code)
+        if point is not None:
+            instance.latitude, instance.longitude = point
+        elif moved:
+            instance.latitude = instance.longitude = None
+    if instance.latitude is not None and instance.longitude is not None:
+        instance.geohash = geohash_encode(instance.latitude, instance.longitude)
+    else:
+        instance.geohash = ''
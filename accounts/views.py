@@ -49,7 +49,7 @@ def login_view(request):
             login(request, user)
             messages.success(request, f'Welcome back, {user.first_name}!')
             # Redirect based on user role
-            if hasattr(user, 'profile') and user.profile.role == 'restaurant_owner':
+            if request.account.is_restaurant_owner:
                 return redirect('restaurant_dashboard')
             return redirect('home')
         else:
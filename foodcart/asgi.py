@@ -1,5 +1,8 @@
 """
 ASGI config for foodcart project.
+Serves the whole site, including the long-lived live order feeds that WSGI
+cannot hold open. Run it with any ASGI server, e.g.
+    uvicorn foodcart.asgi:application
 """
 
 import os
@@ -0,0 +1,45 @@
+"""
+Conditional GET for HTML pages, built on django.views.decorators.http.condition.
+Pages embed the user's navigation and a CSRF token, so their ETags combine the
+version of the content shown with who is asking and their CSRF cookie. They are
+weak ETags (the masked CSRF token differs byte for byte between renders) and
+responses are marked private, no-cache so browsers revalidate every time.
+"""
+
+import hashlib
+from functools import wraps
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+def page_etag(request, *parts):
+    """Weak ETag for a page showing the content identified by parts to this user."""
+    user = request.user
+    identity = (user.pk, user.get_short_name(), request.account.role) if user.is_authenticated else None
+    key = repr((parts, identity, request.COOKIES.get(settings.CSRF_COOKIE_NAME)))
+    return 'W/"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def conditional_page(etag_func=None, last_modified_func=None):
+    """
+    Like condition(), for pages rendered per user. Requests with flash messages
+    waiting to be shown always get the full page.
+    """
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if len(get_messages(request)):
+                response = view(request, *args, **kwargs)
+            else:
+                response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
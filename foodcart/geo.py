@@ -0,0 +1,127 @@
+"""
+Geospatial helpers shared by the restaurants and accounts apps.
+Coordinates come from a pluggable geocoder (GEOCODER_BACKEND). FixtureGeocoder
+looks addresses up in a local JSON file of postal codes and city centres, which is
+enough for development and tests; production can plug in a real geocoding service
+by implementing BaseGeocoder.geocode().
+
+Nearby searches avoid PostGIS: each row stores a geohash, a query covers the search
+area with at most four geohash cells (indexed range scans) plus a latitude/longitude
+bounding box, and only the survivors get an exact haversine distance.
+"""
+
+import json
+import math
+import threading
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    """Return the process-wide geocoder configured by GEOCODER_BACKEND."""
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                backend = getattr(settings, 'GEOCODER_BACKEND', 'foodcart.geo.FixtureGeocoder')
+                _geocoder = import_string(backend)()
+    return _geocoder
+
+
+class BaseGeocoder:
+    """Interface for geocoders."""
+
+    def geocode(self, address, city, postal_code=''):
+        """Return (latitude, longitude) for an address, or None if it cannot be found."""
+        raise NotImplementedError
+
+
+class FixtureGeocoder(BaseGeocoder):
+    """
+    Geocoder backed by a local JSON fixture (GEOCODER_FIXTURE) of the form
+    {"postal_codes": {"400001": [lat, lng]}, "cities": {"mumbai": [lat, lng]}}.
+    Postal codes are tried first, then the city centre.
+    """
+
+    def __init__(self):
+        path = getattr(settings, 'GEOCODER_FIXTURE', settings.BASE_DIR / 'foodcart' / 'fixtures' / 'geocoder.json')
+        with open(path, encoding='utf-8') as fixture:
+            data = json.load(fixture)
+        self.postal_codes = data.get('postal_codes', {})
+        self.cities = {city.lower(): point for city, point in data.get('cities', {}).items()}
+
+    def geocode(self, address, city, postal_code=''):
+        point = self.postal_codes.get((postal_code or '').strip()) or self.cities.get((city or '').strip().lower())
+        return tuple(point) if point else None
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, km):
+    """Return (min_lat, max_lat, min_lng, max_lng) enclosing a circle of km around a point."""
+    d_lat = math.degrees(km / EARTH_RADIUS_KM)
+    d_lng = math.degrees(km / (EARTH_RADIUS_KM * max(math.cos(math.radians(lat)), 1e-6)))
+    return (
+        max(lat - d_lat, -90.0), min(lat + d_lat, 90.0),
+        max(lng - d_lng, -180.0), min(lng + d_lng, 180.0),
+    )
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    """Encode a point as a geohash string."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        target, span = (lng, lng_range) if even else (lat, lat_range)
+        middle = (span[0] + span[1]) / 2
+        value <<= 1
+        if target >= middle:
+            value |= 1
+            span[0] = middle
+        else:
+            span[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision):
+    """Return (height, width) in degrees of a geohash cell."""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def covering_geohashes(min_lat, max_lat, min_lng, max_lng):
+    """
+    Return at most four geohash prefixes whose cells cover the box: the longest
+    precision whose cells are at least as large as the box, so its corners fall in
+    every cell it touches.
+    """
+    precision = GEOHASH_PRECISION
+    while precision > 1:
+        height, width = geohash_cell_size(precision)
+        if height >= max_lat - min_lat and width >= max_lng - min_lng:
+            break
+        precision -= 1
+    return sorted({
+        geohash_encode(lat, lng, precision)
+        for lat in (min_lat, max_lat) for lng in (min_lng, max_lng)
+    })
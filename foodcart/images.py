@@ -0,0 +1,182 @@
+"""
+Image renditions shared by the restaurants and accounts apps.
+Uploaded restaurant, menu item and profile images are resized with Pillow into
+WebP and JPEG renditions at the widths in IMAGE_RENDITION_WIDTHS, stored under
+renditions/ in the "renditions" storage (the default storage if STORAGES has
+none) with a manifest.json listing what was written. Generation runs on a small
+thread pool once the upload's transaction commits, so requests never wait for
+it; until a manifest exists templates simply keep using the original file.
+
+The {% picture %} tag in restaurants/templatetags/image_tags.py builds the
+<picture>/srcset markup from the manifest.
+"""
+
+import json
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage, storages
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Widths in pixels; an image is never enlarged past its own width
+IMAGE_RENDITION_WIDTHS = (160, 400, 800)
+
+# (format, Pillow format, extension), most preferred first
+IMAGE_RENDITION_FORMATS = (
+    ('webp', 'WEBP', 'webp'),
+    ('jpeg', 'JPEG', 'jpg'),
+)
+IMAGE_RENDITION_QUALITY = 80
+
+# Seconds a manifest lookup stays cached when no renditions exist yet
+MISSING_MANIFEST_TIMEOUT = 60
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_rendition_storage():
+    """
+    Storage for renditions. It must keep the names it is given, which the
+    content-addressed default storage does not.
+    """
+    return storages['renditions'] if 'renditions' in settings.STORAGES else default_storage
+
+
+def rendition_dir(name):
+    """Storage directory holding the renditions of an original image."""
+    return posixpath.join('renditions', posixpath.splitext(name)[0])
+
+
+def _manifest_cache_key(name):
+    return f'image_renditions:{name}'
+
+
+def get_renditions(name):
+    """
+    Return the manifest of an image, {format: [(width, url), ...]} sorted by width,
+    or None if its renditions have not been generated.
+    """
+    if not name:
+        return None
+    key = _manifest_cache_key(name)
+    manifest = cache.get(key)
+    if manifest is None:
+        path = posixpath.join(rendition_dir(name), 'manifest.json')
+        try:
+            with get_rendition_storage().open(path) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            manifest = {}
+        cache.set(key, manifest, None if manifest else MISSING_MANIFEST_TIMEOUT)
+    if not manifest:
+        return None
+    storage = get_rendition_storage()
+    return {
+        fmt: [(width, storage.url(path)) for width, path in renditions]
+        for fmt, renditions in manifest.items()
+    }
+
+
+def generate_renditions(name):
+    """Write every rendition and the manifest of a stored image; returns the manifest."""
+    with default_storage.open(name) as original:
+        image = Image.open(original)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+    storage = get_rendition_storage()
+    directory = rendition_dir(name)
+    widths = sorted({min(width, image.width) for width in IMAGE_RENDITION_WIDTHS})
+    manifest = {fmt: [] for fmt, _, _ in IMAGE_RENDITION_FORMATS}
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt, pillow_format, extension in IMAGE_RENDITION_FORMATS:
+            output = resized
+            if pillow_format == 'JPEG' and output.mode == 'RGBA':
+                # JPEG has no alpha channel; flatten onto white
+                output = Image.new('RGB', resized.size, (255, 255, 255))
+                output.paste(resized, mask=resized.getchannel('A'))
+            buffer = BytesIO()
+            output.save(buffer, pillow_format, quality=IMAGE_RENDITION_QUALITY, optimize=True)
+            path = posixpath.join(directory, f'{width}w.{extension}')
+            if storage.exists(path):
+                storage.delete(path)
+            manifest[fmt].append((width, storage.save(path, ContentFile(buffer.getvalue()))))
+
+    manifest_path = posixpath.join(directory, 'manifest.json')
+    if storage.exists(manifest_path):
+        storage.delete(manifest_path)
+    storage.save(manifest_path, ContentFile(json.dumps(manifest).encode()))
+    cache.set(_manifest_cache_key(name), manifest, None)
+    return manifest
+
+
+def delete_renditions(name):
+    """Delete the renditions and manifest of an image that is being removed."""
+    storage = get_rendition_storage()
+    directory = rendition_dir(name)
+    manifest_path = posixpath.join(directory, 'manifest.json')
+    try:
+        with storage.open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        manifest = {}
+    for renditions in manifest.values():
+        for _, path in renditions:
+            storage.delete(path)
+    storage.delete(manifest_path)
+    cache.delete(_manifest_cache_key(name))
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'IMAGE_RENDITION_WORKERS', 2),
+                    thread_name_prefix='image-renditions',
+                )
+    return _executor
+
+
+def _generate_in_background(name, on_ready):
+    try:
+        generate_renditions(name)
+    except Exception:
+        logger.exception('Could not generate renditions of %s', name)
+        return
+    if on_ready is not None:
+        on_ready()
+
+
+def schedule_renditions(image, on_ready=None):
+    """
+    Generate renditions of an image field's file after the current transaction
+    commits, unless they already exist. on_ready runs once they have been written,
+    e.g. to invalidate cached pages that used the original file.
+    With IMAGE_RENDITIONS_ASYNC = False they are generated on the spot instead.
+    """
+    name = image.name if image else ''
+    if not name or get_renditions(name) is not None:
+        return
+
+    def run():
+        if getattr(settings, 'IMAGE_RENDITIONS_ASYNC', True):
+            _get_executor().submit(_generate_in_background, name, on_ready)
+        else:
+            _generate_in_background(name, on_ready)
+
+    transaction.on_commit(run)
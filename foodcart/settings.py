@@ -38,6 +38,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.AccountMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -55,6 +56,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'accounts.context_processors.account',
             ],
         },
     },
@@ -70,6 +72,47 @@ DATABASES = {
     }
 }
 
+# Cache
+# Local memory by default; point at a Redis server in production, e.g.
+# {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Cart storage (see orders/cart_store.py)
+# Use 'orders.cart_store.CacheCartStore' to keep carts in the cache until checkout
+CART_STORE_BACKEND = 'orders.cart_store.DatabaseCartStore'
+CART_STORE_CACHE_ALIAS = 'default'
+CART_STORE_TIMEOUT = 60 * 60 * 24 * 7  # One week
+
+# Live order events (see orders/events.py)
+# LocalBroker delivers within one process; use a shared broker with several workers
+ORDER_EVENTS_BROKER = 'orders.events.LocalBroker'
+
+# Cached restaurant menu pages (see restaurants/menu_cache.py)
+MENU_CACHE_ALIAS = 'default'
+
+# Account versions (see accounts/account_cache.py)
+# Left unset, each request checks the version on the profile row; only point this at
+# a cache every worker shares (e.g. Redis), never a per-process locmem cache
+# ACCOUNT_VERSION_CACHE_ALIAS = 'shared'
+
+# Resized image renditions (see foodcart/images.py)
+# Generated on a background thread pool after upload; set IMAGE_RENDITIONS_ASYNC = False to generate inline
+IMAGE_RENDITIONS_ASYNC = True
+IMAGE_RENDITION_WORKERS = 2
+
+# Geocoding for restaurants and delivery addresses (see foodcart/geo.py)
+# FixtureGeocoder looks up foodcart/fixtures/geocoder.json; plug in a real geocoder for production
+GEOCODER_BACKEND = 'foodcart.geo.FixtureGeocoder'
+GEOCODER_FIXTURE = BASE_DIR / 'foodcart' / 'fixtures' / 'geocoder.json'
+
+# Restaurant search (see restaurants/search.py)
+# Left unset, SQLite uses the FTS5 index and other databases use BasicSearchBackend
+# RESTAURANT_SEARCH_BACKEND = 'restaurants.search.BasicSearchBackend'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -101,6 +144,15 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored once per unique content under media/cas/ (see foodcart/storage.py).
+# Renditions need stable names, so they use a plain FileSystemStorage over the same directory.
+# Web servers serving media/cas/ directly should send "Cache-Control: public, max-age=31536000, immutable".
+STORAGES = {
+    'default': {'BACKEND': 'foodcart.storage.ContentAddressedStorage'},
+    'renditions': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
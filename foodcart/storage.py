@@ -0,0 +1,95 @@
+"""
+Content-addressed media storage.
+ContentAddressedStorage stores each upload under the SHA-256 hash of its bytes
+(cas/ab/cd/abcd....jpg), so the same photo uploaded for dozens of branches is kept
+once. restaurants.MediaBlob counts the image fields that point at each blob; the
+receivers in the restaurants and accounts apps release a file when its row is
+deleted or its image replaced, and the blob is removed after the last release.
+
+A blob's name changes with its content, so it can be served with a far-future
+immutable Cache-Control header (see foodcart.views.media_blob_view).
+"""
+
+import hashlib
+import posixpath
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+BLOB_PREFIX = 'cas'
+
+# Cache-Control for blobs; their URLs never change meaning
+BLOB_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def is_blob_name(name):
+    return bool(name) and name.startswith(BLOB_PREFIX + '/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that names files by their content hash and keeps one copy
+    of each, with reference counts in restaurants.MediaBlob.
+    """
+
+    def blob_name(self, digest, name):
+        extension = posixpath.splitext(name)[1].lower()[:10]
+        return posixpath.join(BLOB_PREFIX, digest[:2], digest[2:4], digest + extension)
+
+    def _save(self, name, content):
+        from restaurants.models import MediaBlob
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        blob = self.blob_name(digest.hexdigest(), name)
+        MediaBlob.add_reference(blob, content.size)
+        if not self.exists(blob):
+            saved = super()._save(blob, content)
+            if saved != blob:
+                # A concurrent upload of the same file got there first
+                super().delete(saved)
+        return blob
+
+    def delete(self, name):
+        """Release one reference to a blob, removing it after the last; other files are deleted outright."""
+        from restaurants.models import MediaBlob
+
+        if not is_blob_name(name):
+            return super().delete(name)
+        if MediaBlob.remove_reference(name):
+            transaction.on_commit(lambda: self._delete_unreferenced(name))
+
+    def _delete_unreferenced(self, name):
+        from foodcart.images import delete_renditions
+        from restaurants.models import MediaBlob
+
+        # The same content may have been uploaded again since the last release
+        if not MediaBlob.objects.filter(name=name).exists():
+            super().delete(name)
+            delete_renditions(name)
+
+
+def remember_replaced_file(instance, field_name):
+    """
+    For pre_save receivers: note the blob a save is about to replace, which is
+    only looked up when a new file was assigned or the field was cleared.
+    """
+    file = getattr(instance, field_name)
+    previous = None
+    if instance.pk and not (file and file._committed) and isinstance(file.storage, ContentAddressedStorage):
+        previous = type(instance)._default_manager.filter(pk=instance.pk).values_list(field_name, flat=True).first()
+    setattr(instance, f'_replaced_{field_name}', previous if previous != file.name else None)
+
+
+def release_replaced_file(instance, field_name):
+    """For post_save receivers: release the blob noted by remember_replaced_file()."""
+    name = getattr(instance, f'_replaced_{field_name}', None)
+    storage = getattr(instance, field_name).storage
+    if is_blob_name(name) and isinstance(storage, ContentAddressedStorage):
+        storage.delete(name)
+
+
+def release_file(file):
+    """Release the blob behind a FieldFile whose row is being deleted."""
+    if file and is_blob_name(file.name) and isinstance(file.storage, ContentAddressedStorage):
+        file.storage.delete(file.name)
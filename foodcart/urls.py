@@ -4,7 +4,7 @@ Routes all apps to their respective URL patterns.
 """
 
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from . import views
@@ -21,6 +21,14 @@ urlpatterns = [
     path('orders/', include('orders.urls')),
 ]
 
+# Content-addressed uploads (see foodcart/storage.py), served with immutable cache headers
+if settings.MEDIA_URL.startswith('/'):
+    urlpatterns.append(re_path(
+        r'^%scas/(?P<path>[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]+)?)$' % settings.MEDIA_URL.lstrip('/'),
+        views.media_blob_view,
+        name='media_blob',
+    ))
+
 # Serve media files in development
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
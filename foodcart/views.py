@@ -3,16 +3,48 @@ Views for main foodcart project.
 Contains home page and error pages.
 """
 
+import mimetypes
+import posixpath
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponseNotModified
 from django.shortcuts import render
+from django.views.decorators.http import require_http_methods
 from restaurants.models import Restaurant
+from .storage import BLOB_CACHE_CONTROL, BLOB_PREFIX
 
 def home_view(request):
     """
     Home page view.
-    Displays featured restaurants and search functionality.
+    Displays the most popular restaurants open now (or overall when none are), restaurants
+    opening soon and search functionality.
     """
-    restaurants = Restaurant.objects.filter(is_verified=True)[:8]
+    restaurants = Restaurant.objects.filter(is_verified=True)
+    open_restaurants = list(restaurants.open_now()[:8])
     context = {
-        'restaurants': restaurants,
+        'restaurants': open_restaurants or list(restaurants[:8]),
+        'showing_open': bool(open_restaurants),
+        'opening_soon': restaurants.opening_soon().order_by('opens_in', '-rating')[:4],
     }
     return render(request, 'home.html', context)
+
+
+@require_http_methods(["GET", "HEAD"])
+def media_blob_view(request, path):
+    """
+    Serve a content-addressed upload. The name is the file's hash, so the response
+    can be cached forever and revalidated by ETag alone.
+    """
+    name = posixpath.join(BLOB_PREFIX, path)
+    etag = '"%s"' % posixpath.splitext(posixpath.basename(name))[0]
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        try:
+            blob = default_storage.open(name)
+        except FileNotFoundError:
+            raise Http404('Media file not found')
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        response = FileResponse(blob, content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = BLOB_CACHE_CONTROL
+    return response
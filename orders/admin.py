@@ -4,7 +4,7 @@ Registers models to be manageable via Django admin interface.
 """
 
 from django.contrib import admin
-from .models import Cart, CartItem, Order, OrderItem, Review
+from .models import Cart, CartItem, MenuItemSales, Order, OrderItem, Review
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
@@ -43,6 +43,14 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_filter = ('order__restaurant',)
     search_fields = ('order__order_number', 'menu_item__name')
 
+@admin.register(MenuItemSales)
+class MenuItemSalesAdmin(admin.ModelAdmin):
+    """Admin interface for the daily bestseller rollup (rebuilt by rebuild_menu_item_sales)."""
+    list_display = ('menu_item', 'restaurant', 'day', 'quantity')
+    list_filter = ('day',)
+    search_fields = ('menu_item__name', 'restaurant__name')
+    readonly_fields = ('restaurant', 'menu_item', 'day', 'quantity')
+
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     """Admin interface for reviews."""
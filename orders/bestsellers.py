@@ -0,0 +1,135 @@
+"""
+Bestseller lists for the orders app.
+Delivered quantities are rolled up per menu item and day (MenuItemSales) as orders
+reach "delivered", so a restaurant's bestsellers over the last BESTSELLER_WEEK_DAYS
+and BESTSELLER_MONTH_DAYS days are one range scan of the rollup instead of a GROUP
+BY over every OrderItem. Sales count on the day the order was placed, in the
+project's TIME_ZONE, which is also how rebuild_menu_item_sales recomputes them.
+
+The detail page and menu document embed the list and are cached per menu version
+and day, so record_sales() bumps the menu version of each restaurant in a delivery
+batch, and the windows roll forward with the day on their own.
+
+Rows older than BESTSELLER_MONTH_DAYS are never read but are only dropped by
+rebuild_menu_item_sales, so run that command daily (e.g. from cron) to keep the
+rollup at one month of rows.
+"""
+
+import operator
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import reduce
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from restaurants.menu_cache import bump_menu_version
+from .models import MenuItemSales, OrderItem
+
+BESTSELLER_WEEK_DAYS = 7
+BESTSELLER_MONTH_DAYS = 30
+
+# Items in a bestseller list
+BESTSELLER_COUNT = 5
+
+
+def bestsellers_queryset(restaurant_id, today):
+    """Rows of a restaurant's available items with their week and month quantities, best first."""
+    week_start = today - timedelta(days=BESTSELLER_WEEK_DAYS - 1)
+    month_start = today - timedelta(days=BESTSELLER_MONTH_DAYS - 1)
+    return (
+        MenuItemSales.objects
+        .filter(restaurant_id=restaurant_id, day__gte=month_start, menu_item__is_available=True)
+        .values('menu_item_id', 'menu_item__name', 'menu_item__price', 'menu_item__is_vegetarian')
+        .annotate(week=Sum('quantity', filter=Q(day__gte=week_start), default=0), month=Sum('quantity'))
+        .order_by('-week', '-month', 'menu_item_id')
+    )
+
+
+def get_bestsellers(restaurant_id, limit=BESTSELLER_COUNT, today=None):
+    """
+    Return a restaurant's most ordered available items, ranked by quantity over the
+    last week and then the last month, as dicts with id, name, price, is_vegetarian,
+    week and month. One query over the rollup's (restaurant, day) index.
+    """
+    rows = bestsellers_queryset(restaurant_id, today or timezone.localdate())[:limit]
+    return [
+        {
+            'id': row['menu_item_id'],
+            'name': row['menu_item__name'],
+            'price': row['menu_item__price'],
+            'is_vegetarian': row['menu_item__is_vegetarian'],
+            'week': row['week'],
+            'month': row['month'],
+        }
+        for row in rows
+    ]
+
+
+def record_sales(order_ids):
+    """
+    Add the items of orders that have just moved to "delivered" to the daily rollup.
+    Each order must be recorded exactly once, so only pass orders whose transition
+    the caller has just made. Three queries however many lines the orders have.
+    """
+    if not order_ids:
+        return
+    quantities = defaultdict(int)
+    lines = OrderItem.objects.filter(order_id__in=order_ids).values_list(
+        'order__restaurant_id', 'order__created_at', 'menu_item_id', 'quantity',
+    )
+    for restaurant_id, created_at, menu_item_id, quantity in lines:
+        quantities[(restaurant_id, menu_item_id, timezone.localdate(created_at))] += quantity
+    if not quantities:
+        return
+
+    with transaction.atomic(savepoint=False):
+        MenuItemSales.objects.bulk_create(
+            [
+                MenuItemSales(restaurant_id=restaurant_id, menu_item_id=menu_item_id, day=day)
+                for restaurant_id, menu_item_id, day in quantities
+            ],
+            ignore_conflicts=True,
+        )
+        matches = [
+            (Q(menu_item_id=menu_item_id, day=day), quantity)
+            for (_, menu_item_id, day), quantity in quantities.items()
+        ]
+        MenuItemSales.objects.filter(reduce(operator.or_, (match for match, _ in matches))).update(
+            quantity=F('quantity') + Case(*(When(match, then=Value(quantity)) for match, quantity in matches)),
+        )
+        for restaurant_id in {restaurant_id for restaurant_id, _, _ in quantities}:
+            bump_menu_version(restaurant_id)
+
+
+def rebuild_menu_item_sales(days=BESTSELLER_MONTH_DAYS, today=None):
+    """
+    Recompute the rollup for the last `days` days from delivered orders and drop older
+    rows. Returns the number of rows written.
+    """
+    today = today or timezone.localdate()
+    start = timezone.make_aware(datetime.combine(today - timedelta(days=days - 1), datetime.min.time()))
+    rows = (
+        OrderItem.objects
+        .filter(order__status='delivered', order__created_at__gte=start)
+        .values('order__restaurant_id', 'menu_item_id', day=TruncDate('order__created_at'))
+        .annotate(total=Sum('quantity'))
+        .order_by()
+    )
+    with transaction.atomic():
+        restaurant_ids = set(MenuItemSales.objects.values_list('restaurant_id', flat=True).distinct())
+        MenuItemSales.objects.all().delete()
+        sales = MenuItemSales.objects.bulk_create(
+            [
+                MenuItemSales(
+                    restaurant_id=row['order__restaurant_id'], menu_item_id=row['menu_item_id'],
+                    day=row['day'], quantity=row['total'],
+                )
+                for row in rows.iterator()
+            ],
+            batch_size=1000,
+        )
+        restaurant_ids.update(sale.restaurant_id for sale in sales)
+        for restaurant_id in restaurant_ids:
+            bump_menu_version(restaurant_id)
+    return len(sales)
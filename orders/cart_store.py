@@ -0,0 +1,441 @@
+"""
+Cart storage backends for the orders app.
+The cart views talk to a store instead of the Cart/CartItem models directly so the
+storage can be swapped with the CART_STORE_BACKEND setting:
+
+- DatabaseCartStore keeps lines in Cart/CartItem rows (the default).
+- CacheCartStore keeps lines in Django's cache (locmem, Redis, ...) and only writes
+  Cart/CartItem rows when the customer checks out, so abandoned carts never touch
+  the orders_cart and orders_cartitem tables. Each change re-reads and rewrites the
+  cart under a short lock taken with cache.add(), so two tabs changing the cart at
+  once do not lose each other's changes.
+"""
+
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.module_loading import import_string
+from restaurants.models import MenuItem, Restaurant
+from .models import Cart, CartItem
+
+
+# Seconds a cache cart lock is held at most, and waited for before giving up
+CART_LOCK_TIMEOUT = 5
+CART_LOCK_WAIT = 3
+
+
+class CartError(Exception):
+    """Raised when a cart operation cannot be applied."""
+
+
+class CartPricesChanged(CartError):
+    """Raised at checkout when cart lines no longer carry the current menu prices."""
+
+
+def get_cart_store(user):
+    """Return the configured cart store for a user."""
+    backend = getattr(settings, 'CART_STORE_BACKEND', 'orders.cart_store.DatabaseCartStore')
+    return import_string(backend)(user)
+
+
+def resolve_operations(quantities, restaurant_id, operations):
+    """
+    Fold a list of (action, menu_item_id, quantity) operations into final quantities.
+    `quantities` maps menu item ids already in the cart to their quantity.
+    Loads every referenced menu item in one query and returns
+    (quantities, menu_items, restaurant_id); lines with quantity 0 are to be removed.
+    """
+    quantities = dict(quantities)
+    menu_items = MenuItem.objects.in_bulk({item_id for action, item_id, quantity in operations})
+    for action, item_id, quantity in operations:
+        menu_item = menu_items.get(item_id)
+        if menu_item is None:
+            raise CartError(f'Menu item {item_id} does not exist.')
+        if action == 'add':
+            quantities[item_id] = quantities.get(item_id, 0) + quantity
+        elif action == 'update':
+            quantities[item_id] = quantity
+        elif action == 'remove':
+            quantities[item_id] = 0
+        else:
+            raise CartError(f'Unknown cart action: {action}')
+        quantities[item_id] = max(quantities[item_id], 0)
+
+    # Lines untouched by the operations already belong to the cart's restaurant
+    remaining = [item_id for item_id, quantity in quantities.items() if quantity > 0]
+    restaurant_ids = {
+        menu_items[item_id].restaurant_id if item_id in menu_items else restaurant_id
+        for item_id in remaining
+    }
+    if len(restaurant_ids) > 1:
+        raise CartError('You can only order from one restaurant at a time. Clear your cart first.')
+    return quantities, menu_items, restaurant_ids.pop() if restaurant_ids else None
+
+
+class CartLine:
+    """
+    A cart line held outside the database.
+    Mirrors the CartItem attributes the cart templates use.
+    """
+
+    def __init__(self, menu_item, quantity, unit_price):
+        self.id = menu_item.id
+        self.menu_item = menu_item
+        self.quantity = quantity
+        self.unit_price = unit_price
+
+    def get_item_total(self):
+        """Calculate total price for this cart line."""
+        return self.unit_price * self.quantity
+
+
+class BaseCartStore:
+    """
+    Interface shared by all cart stores.
+    Line ids are whatever the store hands out in get_lines() and are only
+    meaningful to the same store.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @property
+    def restaurant_id(self):
+        raise NotImplementedError
+
+    @property
+    def restaurant(self):
+        """Restaurant the cart is locked to, or None for an empty cart."""
+        if self.restaurant_id is None:
+            return None
+        return Restaurant.objects.get(id=self.restaurant_id)
+
+    def get_total_price(self):
+        raise NotImplementedError
+
+    def get_item_count(self):
+        raise NotImplementedError
+
+    def get_lines(self):
+        """Return the cart lines with their menu items loaded."""
+        raise NotImplementedError
+
+    def add(self, menu_item, quantity=1):
+        """Add quantity of a menu item, locking the cart to its restaurant."""
+        raise NotImplementedError
+
+    def set_quantity(self, line_id, quantity):
+        """Set a line's quantity. Returns the line, or None when it was removed."""
+        raise NotImplementedError
+
+    def remove(self, line_id):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def apply_operations(self, operations):
+        """
+        Apply a batch of (action, menu_item_id, quantity) operations at once.
+        Actions are 'add', 'update' and 'remove'; raises CartError without changing
+        the cart if any operation is invalid.
+        """
+        raise NotImplementedError
+
+    def replace_lines(self, quantities):
+        """
+        Replace the whole cart with {menu_item_id: quantity} in one atomic step, at
+        current menu prices. Raises CartError without changing the cart if invalid.
+        """
+        raise NotImplementedError
+
+    def reprice(self):
+        """Reconcile line prices with the menu. Returns the lines whose price changed."""
+        raise NotImplementedError
+
+    def materialize(self):
+        """Return a Cart row holding the current lines, ready for create_order()."""
+        raise NotImplementedError
+
+    def discard(self):
+        """Forget the cart after create_order() has turned it into an order."""
+        raise NotImplementedError
+
+
+class DatabaseCartStore(BaseCartStore):
+    """Cart store backed by the Cart and CartItem models."""
+
+    def __init__(self, user):
+        super().__init__(user)
+        self._cart = None
+
+    @property
+    def cart(self):
+        if self._cart is None:
+            self._cart, created = Cart.objects.get_or_create(user=self.user)
+        return self._cart
+
+    @property
+    def restaurant_id(self):
+        return self.cart.restaurant_id
+
+    @property
+    def restaurant(self):
+        return self.cart.restaurant
+
+    def get_total_price(self):
+        return self.cart.get_total_price()
+
+    def get_item_count(self):
+        return self.cart.get_item_count()
+
+    def get_lines(self):
+        return list(self.cart.items.select_related('menu_item__restaurant'))
+
+    def add(self, menu_item, quantity=1):
+        if self.cart.restaurant_id is None:
+            self.cart.restaurant = menu_item.restaurant
+            self.cart.save(update_fields=['restaurant', 'updated_at'])
+        return self.cart.add_item(menu_item, quantity)
+
+    def set_quantity(self, line_id, quantity):
+        cart_item = get_object_or_404(CartItem, id=line_id, cart=self.cart)
+        self.cart.set_item_quantity(cart_item, quantity)
+        return cart_item if quantity > 0 else None
+
+    def remove(self, line_id):
+        cart_item = get_object_or_404(CartItem, id=line_id, cart=self.cart)
+        self.cart.remove_item(cart_item)
+
+    def clear(self):
+        self.cart.clear()
+
+    def apply_operations(self, operations):
+        with transaction.atomic():
+            cart, created = Cart.objects.select_for_update().get_or_create(user=self.user)
+            existing = {item.menu_item_id: item for item in cart.items.all()}
+            quantities, menu_items, restaurant_id = resolve_operations(
+                {item_id: item.quantity for item_id, item in existing.items()},
+                cart.restaurant_id,
+                operations,
+            )
+
+            to_create, to_update, to_delete, lines = [], [], [], []
+            for item_id, quantity in quantities.items():
+                cart_item = existing.get(item_id)
+                if quantity <= 0:
+                    if cart_item is not None:
+                        to_delete.append(cart_item.id)
+                    continue
+                if cart_item is None:
+                    menu_item = menu_items[item_id]
+                    cart_item = CartItem(cart=cart, menu_item=menu_item, quantity=quantity, unit_price=menu_item.price)
+                    to_create.append(cart_item)
+                elif cart_item.quantity != quantity:
+                    cart_item.quantity = quantity
+                    to_update.append(cart_item)
+                lines.append(cart_item)
+
+            if to_delete:
+                CartItem.objects.filter(id__in=to_delete).delete()
+            if to_update:
+                CartItem.objects.bulk_update(to_update, ['quantity'])
+            if to_create:
+                CartItem.objects.bulk_create(to_create)
+
+            cart.restaurant_id = restaurant_id
+            cart.subtotal = sum((line.get_item_total() for line in lines), Decimal('0'))
+            cart.item_count = sum(line.quantity for line in lines)
+            cart.save(update_fields=['restaurant', 'subtotal', 'item_count', 'updated_at'])
+        self._cart = cart
+
+    def replace_lines(self, quantities):
+        with transaction.atomic():
+            cart, created = Cart.objects.select_for_update().get_or_create(user=self.user)
+            cart.clear()
+            self._cart = cart
+            self.apply_operations([('add', item_id, quantity) for item_id, quantity in quantities.items()])
+
+    def reprice(self):
+        return self.cart.reprice()
+
+    def materialize(self):
+        return self.cart
+
+    def discard(self):
+        # create_order() already cleared the cart rows in its transaction
+        pass
+
+
+class CacheCartStore(BaseCartStore):
+    """
+    Cart store backed by Django's cache framework.
+    Works with any configured cache (locmem, Redis, Memcached). Lines are kept as
+    {menu_item_id: [quantity, unit_price]} under one key per user and are only
+    written to the database by materialize() at checkout.
+    """
+
+    def __init__(self, user):
+        super().__init__(user)
+        self.cache = caches[getattr(settings, 'CART_STORE_CACHE_ALIAS', 'default')]
+        self.timeout = getattr(settings, 'CART_STORE_TIMEOUT', 60 * 60 * 24 * 7)
+        self.key = f'cart:{user.pk}'
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = self.cache.get(self.key) or {'restaurant_id': None, 'lines': {}}
+        return self._data
+
+    @contextmanager
+    def _locked(self):
+        """
+        Hold the cart's lock around a read-modify-write. cache.add() only succeeds
+        for one caller at a time; the cart is re-read once the lock is taken.
+        """
+        lock_key = f'{self.key}:lock'
+        deadline = time.monotonic() + CART_LOCK_WAIT
+        while not self.cache.add(lock_key, 1, CART_LOCK_TIMEOUT):
+            if time.monotonic() > deadline:
+                raise CartError('Your cart is being updated elsewhere. Please try again.')
+            time.sleep(0.01)
+        try:
+            self._data = None
+            yield
+        finally:
+            self.cache.delete(lock_key)
+
+    def _save(self):
+        if self.data['lines']:
+            self.cache.set(self.key, self.data, self.timeout)
+        else:
+            self._data = {'restaurant_id': None, 'lines': {}}
+            self.cache.delete(self.key)
+
+    @property
+    def restaurant_id(self):
+        return self.data['restaurant_id']
+
+    def get_total_price(self):
+        return sum(
+            (Decimal(price) * quantity for quantity, price in self.data['lines'].values()),
+            Decimal('0'),
+        )
+
+    def get_item_count(self):
+        return sum(quantity for quantity, price in self.data['lines'].values())
+
+    def get_lines(self):
+        lines = self.data['lines']
+        menu_items = MenuItem.objects.select_related('restaurant').in_bulk([int(i) for i in lines])
+        return [
+            CartLine(menu_items[int(item_id)], quantity, Decimal(price))
+            for item_id, (quantity, price) in lines.items()
+            if int(item_id) in menu_items
+        ]
+
+    def add(self, menu_item, quantity=1):
+        with self._locked():
+            lines = self.data['lines']
+            key = str(menu_item.id)
+            if key in lines:
+                lines[key][0] += quantity
+            else:
+                lines[key] = [quantity, str(menu_item.price)]
+            self.data['restaurant_id'] = menu_item.restaurant_id
+            self._save()
+            line = lines[key]
+        return CartLine(menu_item, line[0], Decimal(line[1]))
+
+    def _get_line_data(self, line_id):
+        line = self.data['lines'].get(str(line_id))
+        if line is None:
+            raise Http404('Item is not in your cart.')
+        return line
+
+    def set_quantity(self, line_id, quantity):
+        with self._locked():
+            line = self._get_line_data(line_id)
+            if quantity <= 0:
+                del self.data['lines'][str(line_id)]
+            else:
+                line[0] = quantity
+            self._save()
+        if quantity <= 0:
+            return None
+        return CartLine(MenuItem.objects.get(id=line_id), quantity, Decimal(line[1]))
+
+    def remove(self, line_id):
+        with self._locked():
+            self._get_line_data(line_id)
+            del self.data['lines'][str(line_id)]
+            self._save()
+
+    def clear(self):
+        with self._locked():
+            self.data['lines'] = {}
+            self._save()
+
+    def apply_operations(self, operations):
+        with self._locked():
+            self._apply_operations(operations)
+
+    def replace_lines(self, quantities):
+        with self._locked():
+            self.data['lines'] = {}
+            self.data['restaurant_id'] = None
+            self._apply_operations([('add', item_id, quantity) for item_id, quantity in quantities.items()])
+
+    def _apply_operations(self, operations):
+        lines = self.data['lines']
+        quantities, menu_items, restaurant_id = resolve_operations(
+            {int(item_id): quantity for item_id, (quantity, price) in lines.items()},
+            self.restaurant_id,
+            operations,
+        )
+        for item_id, quantity in quantities.items():
+            key = str(item_id)
+            if quantity <= 0:
+                lines.pop(key, None)
+            elif key in lines:
+                lines[key][0] = quantity
+            else:
+                lines[key] = [quantity, str(menu_items[item_id].price)]
+        self.data['restaurant_id'] = restaurant_id
+        self._save()
+
+    def reprice(self):
+        changed = []
+        with self._locked():
+            for line in self.get_lines():
+                if line.unit_price != line.menu_item.price:
+                    line.unit_price = line.menu_item.price
+                    self.data['lines'][str(line.id)][1] = str(line.unit_price)
+                    changed.append(line)
+            if changed:
+                self._save()
+        return changed
+
+    def materialize(self):
+        lines = self.get_lines()
+        with transaction.atomic():
+            cart, created = Cart.objects.select_for_update().get_or_create(user=self.user)
+            cart.items.all().delete()
+            CartItem.objects.bulk_create([
+                CartItem(cart=cart, menu_item=line.menu_item, quantity=line.quantity, unit_price=line.unit_price)
+                for line in lines
+            ])
+            cart.restaurant_id = self.restaurant_id
+            cart.subtotal = sum((line.get_item_total() for line in lines), Decimal('0'))
+            cart.item_count = sum(line.quantity for line in lines)
+            cart.save()
+        return cart
+
+    def discard(self):
+        self.clear()
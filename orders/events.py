@@ -0,0 +1,191 @@
+"""
+Order events for the orders app - publish/subscribe for live order updates.
+Views publish an event whenever an order is placed or changes status; streaming
+endpoints (served through foodcart/asgi.py) subscribe to a channel and push the
+events to the browser instead of making it poll.
+
+The broker is pluggable with the ORDER_EVENTS_BROKER setting. LocalBroker only
+delivers events within a single process, which is enough for development, tests
+and single-worker deployments; multi-worker deployments need a broker backed by a
+shared server (e.g. Redis pub/sub) implementing the BaseBroker methods.
+"""
+
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from .models import ORDER_STATUS_CHOICES
+
+# Seconds between keep-alive comments on an idle event stream
+HEARTBEAT_INTERVAL = 15
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured by ORDER_EVENTS_BROKER."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, 'ORDER_EVENTS_BROKER', 'orders.events.LocalBroker')
+                _broker = import_string(backend)()
+    return _broker
+
+
+def restaurant_channel(restaurant_id):
+    """Channel carrying every order event for one restaurant."""
+    return f'restaurant:{restaurant_id}'
+
+
+def order_channel(order_id):
+    """Channel carrying the events of a single order, for customer tracking."""
+    return f'order:{order_id}'
+
+
+def serialize_order_event(order, event_type):
+    """Build the event payload for an order."""
+    return {
+        'type': event_type,
+        'order_id': order.id,
+        'order_number': order.order_number,
+        'status': order.status,
+        'status_display': order.get_status_display(),
+        'total_amount': str(order.total_amount),
+        'updated_at': order.updated_at.isoformat() if order.updated_at else None,
+    }
+
+
+def _publish(restaurant_id, order_id, event):
+    """
+    Publish an event on the restaurant and order channels once the current
+    transaction commits, so subscribers never hear about rows they cannot read yet.
+    """
+    channels = [restaurant_channel(restaurant_id), order_channel(order_id)]
+
+    def publish():
+        broker = get_broker()
+        for channel in channels:
+            broker.publish(channel, event)
+
+    transaction.on_commit(publish)
+
+
+def publish_order_event(order, event_type):
+    """Publish an event built from an Order instance."""
+    _publish(order.restaurant_id, order.id, serialize_order_event(order, event_type))
+
+
+def publish_status_change(restaurant_id, order_id, status, updated_at):
+    """Publish a status_changed event without needing the Order row loaded."""
+    _publish(restaurant_id, order_id, {
+        'type': 'status_changed',
+        'order_id': order_id,
+        'status': status,
+        'status_display': dict(ORDER_STATUS_CHOICES).get(status, status),
+        'updated_at': updated_at.isoformat(),
+    })
+
+
+class BaseBroker:
+    """Interface for order event brokers."""
+
+    def publish(self, channel, event):
+        """Deliver a JSON-serializable event to every subscriber of channel. Called from sync code."""
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Return a Subscription for channel. Called from async code."""
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        """Stop delivering events to subscription."""
+        raise NotImplementedError
+
+
+class Subscription:
+    """
+    A subscriber's view of one channel.
+    Use as an async context manager and await get() for the next event.
+    """
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    async def get(self, timeout=None):
+        """Wait for the next event. Returns None if timeout seconds pass first."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def deliver(self, event):
+        """Hand an event to this subscriber from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+        except RuntimeError:
+            # The subscriber's event loop has already shut down
+            self.close()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+class LocalBroker(BaseBroker):
+    """In-process broker keeping subscribers in memory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.channel]
+
+
+async def event_stream(channel, max_duration):
+    """
+    Async generator producing a server-sent events stream for channel.
+    Sends keep-alive comments while idle and ends after max_duration seconds;
+    browsers' EventSource reconnects on its own.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_duration
+    async with get_broker().subscribe(channel) as subscription:
+        yield 'retry: 3000\n\n'
+        while loop.time() < deadline:
+            timeout = min(HEARTBEAT_INTERVAL, deadline - loop.time())
+            event = await subscription.get(timeout)
+            if event is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,79 @@
+"""
+Management command to benchmark order placement.
+Builds throwaway carts of increasing size, places an order from each and reports
+the number of queries and time taken. Everything runs inside a rolled back transaction.
+The OrderItem INSERT may be split into several batches by the database's bind
+parameter limit; those batches are reported separately from the fixed query count.
+
+Usage: python manage.py benchmark_checkout --sizes 1 10 50 200
+"""
+
+import time
+import uuid
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from orders.models import Cart, CartItem, OrderItem
+from orders.views import create_order
+from restaurants.models import Restaurant, Category, MenuItem
+
+
+class Command(BaseCommand):
+    help = 'Benchmark create_order query count and latency for several cart sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1, 10, 50, 200],
+                            help='Number of distinct lines in each benchmarked cart')
+
+    def handle(self, *args, **options):
+        results = []
+        with transaction.atomic():
+            for size in options['sizes']:
+                results.append(self._run(size))
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'lines':>8} {'queries':>8} {'batches':>8} {'ms':>10}")
+        for size, queries, batches, elapsed in results:
+            self.stdout.write(f"{size:>8} {queries:>8} {batches:>8} {elapsed * 1000:>10.2f}")
+
+        query_counts = {queries - batches for _, queries, batches, _ in results}
+        if len(query_counts) > 1:
+            raise CommandError('Checkout query count depends on cart size.')
+        self.stdout.write(self.style.SUCCESS('Checkout query count is constant across cart sizes.'))
+
+    def _run(self, size):
+        """Create a cart with `size` lines and time placing an order from it."""
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create_user(f'bench-owner-{tag}')
+        customer = User.objects.create_user(f'bench-customer-{tag}')
+        restaurant = Restaurant.objects.create(
+            owner=owner, name=f'Bench {tag}', description='Benchmark restaurant',
+            image='restaurants/bench.jpg', address='Bench Street', city='Bench',
+            phone='0000000000', email='bench@example.com',
+        )
+        category = Category.objects.create(restaurant=restaurant, name='Bench')
+        menu_items = MenuItem.objects.bulk_create([
+            MenuItem(restaurant=restaurant, category=category, name=f'Item {i}',
+                     description='Benchmark item', image='menu_items/bench.jpg', price=100 + i)
+            for i in range(size)
+        ])
+        cart = Cart.objects.create(user=customer, restaurant=restaurant)
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, menu_item=item, quantity=2, unit_price=item.price)
+            for item in menu_items
+        ])
+        cart.reprice()
+
+        cleaned_data = {'delivery_address': 'Bench Street', 'payment_method': 'cash'}
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            create_order(customer, cart, cleaned_data)
+            elapsed = time.perf_counter() - started
+
+        table = OrderItem._meta.db_table
+        batches = sum(
+            1 for query in ctx.captured_queries
+            if query['sql'].lstrip().upper().startswith('INSERT') and table in query['sql']
+        )
+        return size, len(ctx.captured_queries), batches, elapsed
@@ -0,0 +1,24 @@
+"""
+Management command to rebuild the bestseller rollup from delivered orders.
+Recomputes MenuItemSales for the last --days days with one GROUP BY over order
+items and drops older rows (see orders/bestsellers.py). Deliveries keep the rollup
+up to date on their own; run it once after deploying, then nightly to prune.
+
+Usage: python manage.py rebuild_menu_item_sales [--days 30]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from orders.bestsellers import BESTSELLER_MONTH_DAYS, rebuild_menu_item_sales
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily menu item sales used for bestseller lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=BESTSELLER_MONTH_DAYS)
+
+    def handle(self, *args, **options):
+        if options['days'] < BESTSELLER_MONTH_DAYS:
+            raise CommandError(f'--days must be at least {BESTSELLER_MONTH_DAYS} to cover the bestseller windows.')
+        rows = rebuild_menu_item_sales(days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {rows} daily menu item sales rows.'))
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:47
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def backfill_cart_totals(apps, schema_editor):
+    """Snapshot current menu prices onto existing cart lines and compute cart totals."""
+    Cart = apps.get_model('orders', 'Cart')
+    CartItem = apps.get_model('orders', 'CartItem')
+    for cart in Cart.objects.all():
+        items = list(CartItem.objects.filter(cart=cart).select_related('menu_item'))
+        for item in items:
+            item.unit_price = item.menu_item.price
+        CartItem.objects.bulk_update(items, ['unit_price'])
+        cart.subtotal = sum((item.unit_price * item.quantity for item in items), Decimal('0'))
+        cart.item_count = sum(item.quantity for item in items)
+        cart.save(update_fields=['subtotal', 'item_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_is_archived_by_customer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=8),
+        ),
+        migrations.RunPython(backfill_cart_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_cart_running_totals'),
+        ('restaurants', '0002_restaurant_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'is_archived_by_customer', '-created_at'], name='order_user_history_idx'),
+        ),
+    ]
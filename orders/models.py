@@ -3,8 +3,14 @@ Models for the orders app - Order and cart management.
 Handles shopping cart, orders, and order tracking.
 """
 
-from django.db import models
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from restaurants.menu_cache import bump_menu_version
 from restaurants.models import MenuItem, Restaurant
 
 # Order status choices
@@ -18,6 +24,17 @@ ORDER_STATUS_CHOICES = (
     ('cancelled', 'Cancelled'),
 )
 
+# Allowed order status transitions (current status -> statuses it may move to)
+ORDER_TRANSITIONS = {
+    'placed': ('confirmed', 'preparing', 'cancelled'),
+    'confirmed': ('preparing', 'cancelled'),
+    'preparing': ('ready', 'cancelled'),
+    'ready': ('out_for_delivery', 'delivered'),
+    'out_for_delivery': ('delivered',),
+    'delivered': (),
+    'cancelled': (),
+}
+
 # Payment status choices
 PAYMENT_STATUS_CHOICES = (
     ('pending', 'Pending'),
@@ -30,9 +47,15 @@ class Cart(models.Model):
     """
     Shopping cart for customers.
     Stores menu items temporarily before order placement.
+    Keeps a running subtotal and item count so totals never need a join.
     """
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, null=True, blank=True)
+    
+    # Running totals, maintained by the add/update/remove/clear helpers below
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -40,12 +63,81 @@ class Cart(models.Model):
         return f"Cart of {self.user.username}"
 
     def get_total_price(self):
-        """Calculate total price of all items in cart."""
-        return sum(item.get_item_total() for item in self.items.all())
+        """Total price of all items in cart (denormalized, no queries)."""
+        return self.subtotal
 
     def get_item_count(self):
-        """Get total number of items in cart."""
-        return sum(item.quantity for item in self.items.all())
+        """Total number of items in cart (denormalized, no queries)."""
+        return self.item_count
+
+    def _apply_delta(self, price_delta, count_delta):
+        """
+        Atomically shift the running totals by the given amounts.
+        Uses a single UPDATE with F-expressions so concurrent requests don't lose writes.
+        """
+        Cart.objects.filter(pk=self.pk).update(
+            subtotal=F('subtotal') + price_delta,
+            item_count=F('item_count') + count_delta,
+            updated_at=timezone.now(),
+        )
+        self.refresh_from_db(fields=['subtotal', 'item_count', 'updated_at'])
+
+    def add_item(self, menu_item, quantity=1):
+        """Add quantity of a menu item to the cart, snapshotting its current price."""
+        with transaction.atomic():
+            cart_item, created = CartItem.objects.get_or_create(
+                cart=self,
+                menu_item=menu_item,
+                defaults={'quantity': quantity, 'unit_price': menu_item.price},
+            )
+            if not created:
+                CartItem.objects.filter(pk=cart_item.pk).update(quantity=F('quantity') + quantity)
+                cart_item.refresh_from_db(fields=['quantity'])
+            self._apply_delta(cart_item.unit_price * quantity, quantity)
+        return cart_item
+
+    def set_item_quantity(self, cart_item, quantity):
+        """Set the quantity of a cart item, removing it when quantity drops to zero."""
+        if quantity <= 0:
+            self.remove_item(cart_item)
+            return
+        with transaction.atomic():
+            count_delta = quantity - cart_item.quantity
+            cart_item.quantity = quantity
+            cart_item.save(update_fields=['quantity'])
+            self._apply_delta(cart_item.unit_price * count_delta, count_delta)
+
+    def remove_item(self, cart_item):
+        """Remove a line from the cart."""
+        with transaction.atomic():
+            cart_item.delete()
+            self._apply_delta(-cart_item.get_item_total(), -cart_item.quantity)
+
+    def clear(self):
+        """Remove every line and reset the totals."""
+        with transaction.atomic():
+            self.items.all().delete()
+            self.restaurant = None
+            self.subtotal = Decimal('0')
+            self.item_count = 0
+            self.save(update_fields=['restaurant', 'subtotal', 'item_count', 'updated_at'])
+
+    def reprice(self):
+        """
+        Reconcile line prices with the current menu prices and recompute the totals.
+        Returns the cart items whose price changed since they were added.
+        """
+        with transaction.atomic():
+            items = list(self.items.select_related('menu_item'))
+            changed = [item for item in items if item.unit_price != item.menu_item.price]
+            for item in changed:
+                item.unit_price = item.menu_item.price
+            if changed:
+                CartItem.objects.bulk_update(changed, ['unit_price'])
+            self.subtotal = sum((item.get_item_total() for item in items), Decimal('0'))
+            self.item_count = sum(item.quantity for item in items)
+            self.save(update_fields=['subtotal', 'item_count', 'updated_at'])
+        return changed
 
 
 class CartItem(models.Model):
@@ -56,6 +148,7 @@ class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=8, decimal_places=2, default=0)  # Price when added to cart
     added_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -63,7 +156,7 @@ class CartItem(models.Model):
 
     def get_item_total(self):
         """Calculate total price for this cart item."""
-        return self.menu_item.price * self.quantity
+        return self.unit_price * self.quantity
 
 
 class Order(models.Model):
@@ -106,8 +199,24 @@ class Order(models.Model):
     def __str__(self):
         return f"Order #{self.order_number} - {self.user.username}"
 
+    def get_next_statuses(self):
+        """Return (value, label) pairs for the statuses this order may move to next."""
+        labels = dict(ORDER_STATUS_CHOICES)
+        return [(status, labels[status]) for status in ORDER_TRANSITIONS.get(self.status, ())]
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Customer order history (keyset paginated on created_at, id). Partial on the
+            # archived flag: SQLite can't seek on a boolean compared as a bare column.
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                condition=Q(is_archived_by_customer=False),
+                name='order_user_active_history_idx',
+            ),
+            # Restaurant dashboard's recent orders
+            models.Index(fields=['restaurant', '-created_at'], name='order_restaurant_recent_idx'),
+        ]
 
 
 class OrderItem(models.Model):
@@ -125,6 +234,28 @@ class OrderItem(models.Model):
         return f"{self.menu_item.name} x {self.quantity} (Order #{self.order.order_number})"
 
 
+class MenuItemSales(models.Model):
+    """
+    Daily rollup of delivered quantities per menu item, by the day the order was placed.
+    Maintained by orders/bestsellers.py as orders are delivered, so bestseller lists
+    never aggregate OrderItem directly.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='item_sales')
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='daily_sales')
+    day = models.DateField()
+    quantity = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.menu_item_id} on {self.day}: {self.quantity}"
+
+    class Meta:
+        unique_together = ('menu_item', 'day')
+        indexes = [
+            # Bestseller windows: one range scan per restaurant
+            models.Index(fields=['restaurant', 'day'], name='menu_item_sales_window_idx'),
+        ]
+
+
 class Review(models.Model):
     """
     Customer reviews for orders/restaurants.
@@ -144,3 +275,52 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ('order', 'user')
+
+
+# Signals to keep Restaurant rating aggregates in step with reviews
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, **kwargs):
+    """
+    Signal handler to remember the stored rating of a review that is being edited.
+    """
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = (
+            Review.objects.filter(pk=instance.pk).values_list('restaurant_id', 'rating').first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def apply_review_rating(sender, instance, created, **kwargs):
+    """
+    Signal handler to fold a new or edited review into the restaurant's rating.
+    """
+    previous = getattr(instance, '_previous_rating', None)
+    if created or previous is None:
+        Restaurant.record_rating_change(instance.restaurant_id, added=instance.rating)
+        return
+
+    previous_restaurant_id, previous_rating = previous
+    if previous_restaurant_id == instance.restaurant_id:
+        if previous_rating != instance.rating:
+            Restaurant.record_rating_change(instance.restaurant_id, added=instance.rating, removed=previous_rating)
+    else:
+        Restaurant.record_rating_change(previous_restaurant_id, removed=previous_rating)
+        Restaurant.record_rating_change(instance.restaurant_id, added=instance.rating)
+
+
+@receiver(post_delete, sender=Review)
+def withdraw_review_rating(sender, instance, **kwargs):
+    """
+    Signal handler to remove a deleted review from the restaurant's rating.
+    """
+    Restaurant.record_rating_change(instance.restaurant_id, removed=instance.rating)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_menu(sender, instance, **kwargs):
+    """
+    Signal handler to refresh the cached restaurant page, which shows the rating and latest reviews.
+    """
+    bump_menu_version(instance.restaurant_id)
@@ -0,0 +1,82 @@
+"""
+Order state service for the orders app.
+Every order status change goes through here. Allowed moves are declared in
+ORDER_TRANSITIONS, and each transition is one conditional UPDATE. It only touches
+the changed columns and only matches orders whose current status may legally move
+to the new one, so concurrent kitchen staff cannot clobber each other's updates.
+Deliveries are also added to the bestseller rollup (orders/bestsellers.py).
+"""
+
+from django.db import transaction
+from django.utils import timezone
+from .bestsellers import record_sales
+from .events import publish_status_change
+from .models import Order, ORDER_TRANSITIONS
+
+
+def allowed_sources(new_status):
+    """Return the statuses an order may be in to move to new_status."""
+    return [status for status, targets in ORDER_TRANSITIONS.items() if new_status in targets]
+
+
+def _transition_fields(new_status, now):
+    """Columns written by a transition to new_status."""
+    fields = {'status': new_status, 'updated_at': now}
+    if new_status == 'delivered':
+        fields['payment_status'] = 'completed'
+    return fields
+
+
+def transition_order(order_id, new_status, restaurant_id, expected_status=None):
+    """
+    Move one of a restaurant's orders to new_status with a single UPDATE.
+    If expected_status is given the order must currently be in exactly that status
+    (compare-and-set); otherwise any status allowed to move to new_status matches.
+    Returns True if the order was changed.
+    """
+    sources = allowed_sources(new_status)
+    if expected_status is not None:
+        sources = [expected_status] if expected_status in sources else []
+    if not sources:
+        return False
+
+    now = timezone.now()
+    with transaction.atomic():
+        updated = Order.objects.filter(
+            id=order_id, restaurant_id=restaurant_id, status__in=sources,
+        ).update(**_transition_fields(new_status, now))
+        if updated and new_status == 'delivered':
+            record_sales([order_id])
+
+    if updated:
+        publish_status_change(restaurant_id, order_id, new_status, now)
+    return bool(updated)
+
+
+def bulk_transition_orders(order_ids, new_status, restaurant_id):
+    """
+    Move many of a restaurant's orders to new_status with a single UPDATE.
+    Orders whose current status does not allow the move are left untouched.
+    Returns the ids of the orders that were changed.
+    """
+    sources = allowed_sources(new_status)
+    if not sources or not order_ids:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        updated = Order.objects.filter(
+            id__in=order_ids, restaurant_id=restaurant_id, status__in=sources,
+        ).update(**_transition_fields(new_status, now))
+        if not updated:
+            return []
+
+        # Read back which orders moved so each subscriber gets an accurate event
+        changed_ids = list(
+            Order.objects.filter(id__in=order_ids, status=new_status, updated_at=now).values_list('id', flat=True)
+        )
+        if new_status == 'delivered':
+            record_sales(changed_ids)
+    for order_id in changed_ids:
+        publish_status_change(restaurant_id, order_id, new_status, now)
+    return changed_ids
@@ -11,6 +11,7 @@ urlpatterns = [
     path('cart/', views.cart_view, name='cart'),
     path('cart/add/', views.add_to_cart_view, name='add_to_cart'),
     path('cart/clear/', views.clear_cart_view, name='clear_cart'),
+    path('cart/batch/', views.batch_update_cart_view, name='batch_update_cart'),
     path('cart/<int:item_id>/remove/', views.remove_from_cart_view, name='remove_from_cart'),
     path('cart/<int:item_id>/update/', views.update_cart_item_view, name='update_cart_item'),
     
@@ -19,6 +20,8 @@ urlpatterns = [
     path('order/<int:order_id>/', views.order_detail_view, name='order_detail'),
     path('order/<int:order_id>/delete/', views.delete_order_view, name='delete_order'),
     path('order/<int:order_id>/status/', views.update_order_status_view, name='update_order_status'),
+    path('order/<int:order_id>/status/poll/', views.order_status_poll_view, name='order_status_poll'),
     path('order/<int:order_id>/review/', views.review_order_view, name='review_order'),
+    path('order/<int:order_id>/reorder/', views.reorder_view, name='reorder'),
     path('orders/', views.order_history_view, name='order_history'),
 ]
@@ -6,15 +6,40 @@ Handles cart operations, checkout, and order tracking.
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponseNotModified
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
-from datetime import timedelta
+from django.db import transaction
+from django.db.models import Q
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
 import json
-from .models import Cart, CartItem, Order, OrderItem, Review
+from .models import Cart, Order, OrderItem, Review, ORDER_STATUS_CHOICES, ORDER_TRANSITIONS
 from .forms import CheckoutForm, ReviewForm
+from .cart_store import CartError, CartPricesChanged, get_cart_store
+from .events import get_broker, order_channel, publish_order_event
+from .services import transition_order
+from foodcart.conditional import conditional_page, page_etag
 from restaurants.models import MenuItem, Restaurant
 
+# Upper bound on operations accepted by a single batch cart request
+MAX_CART_OPERATIONS = 100
+
+# Order history pagination
+ORDER_HISTORY_PAGE_SIZE = 20
+HISTORY_CURSOR_EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+# Seconds an order status long-poll is held open before answering 304
+ORDER_STATUS_POLL_TIMEOUT = 25
+
+# Seconds a client should wait before polling again when a 304 could not be held (WSGI)
+ORDER_STATUS_RETRY_AFTER = 10
+
+# Shown when checkout finds cart prices that no longer match the menu
+PRICES_CHANGED_MESSAGE = 'Some prices on the menu have changed. Please review your updated cart.'
+
 @login_required(login_url='login')
 def cart_view(request):
     """
@@ -23,16 +48,15 @@ def cart_view(request):
     Restaurant owners cannot order.
     """
     # Prevent restaurant owners from accessing cart
-    if hasattr(request.user, 'profile') and request.user.profile.role == 'restaurant_owner':
+    if request.account.is_restaurant_owner:
         messages.error(request, 'Restaurant owners cannot place orders.')
         return redirect('restaurant_dashboard')
     
-    cart, created = Cart.objects.get_or_create(user=request.user)
-    cart_items = cart.items.all()
+    cart = get_cart_store(request.user)
     
     context = {
         'cart': cart,
-        'cart_items': cart_items,
+        'cart_items': cart.get_lines(),
         'total_price': cart.get_total_price(),
     }
     return render(request, 'orders/cart.html', context)
@@ -53,31 +77,16 @@ def add_to_cart_view(request):
         menu_item = get_object_or_404(MenuItem, id=item_id)
         
         # Ensure cart is for the same restaurant
-        cart, created = Cart.objects.get_or_create(user=request.user)
+        cart = get_cart_store(request.user)
         
-        if cart.restaurant is None:
-            cart.restaurant = menu_item.restaurant
-            cart.save()
-        elif cart.restaurant != menu_item.restaurant:
+        if cart.restaurant_id not in (None, menu_item.restaurant_id):
             return JsonResponse({
                 'success': False,
                 'message': 'You can only order from one restaurant at a time. Clear your cart first.'
             })
         
-        # Add or update cart item
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            menu_item=menu_item
-        )
-        
-        if not created:
-            cart_item.quantity += quantity
-        else:
-            cart_item.quantity = quantity
-        
-        cart_item.save()
-        cart.updated_at = timezone.now()
-        cart.save()
+        # Add or update cart item (also bumps the cart's running totals)
+        cart.add(menu_item, quantity)
         
         return JsonResponse({
             'success': True,
@@ -96,9 +105,8 @@ def remove_from_cart_view(request, item_id):
     """
     Remove item from cart.
     """
-    cart = get_object_or_404(Cart, user=request.user)
-    cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
-    cart_item.delete()
+    cart = get_cart_store(request.user)
+    cart.remove(item_id)
     
     messages.success(request, 'Item removed from cart.')
     return redirect('cart')
@@ -114,19 +122,59 @@ def update_cart_item_view(request, item_id):
         data = json.loads(request.body)
         quantity = int(data.get('quantity', 1))
         
-        cart = get_object_or_404(Cart, user=request.user)
-        cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
+        cart = get_cart_store(request.user)
+        cart_item = cart.set_quantity(item_id, quantity)
+        
+        return JsonResponse({
+            'success': True,
+            'cart_total': float(cart.get_total_price()),
+            'item_total': float(cart_item.get_item_total()) if cart_item else 0,
+        })
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'message': str(e)})
+
+
+@login_required(login_url='login')
+@require_http_methods(["POST"])
+def batch_update_cart_view(request):
+    """
+    Apply several cart changes at once (AJAX endpoint).
+    Expects {"operations": [{"action": "add"|"update"|"remove", "item_id": <menu item id>, "quantity": n}, ...]}
+    so the frontend can debounce bursts of clicks into a single request.
+    Returns the final state of the cart.
+    """
+    try:
+        data = json.loads(request.body)
+        raw_operations = data.get('operations')
+        if not isinstance(raw_operations, list) or not raw_operations:
+            return JsonResponse({'success': False, 'message': 'No cart operations given.'})
+        if len(raw_operations) > MAX_CART_OPERATIONS:
+            return JsonResponse({'success': False, 'message': f'At most {MAX_CART_OPERATIONS} operations per request.'})
+        
+        operations = [
+            (op.get('action'), int(op.get('item_id')), int(op.get('quantity', 1)))
+            for op in raw_operations
+        ]
         
-        if quantity <= 0:
-            cart_item.delete()
-        else:
-            cart_item.quantity = quantity
-            cart_item.save()
+        cart = get_cart_store(request.user)
+        cart.apply_operations(operations)
         
         return JsonResponse({
             'success': True,
+            'cart_count': cart.get_item_count(),
             'cart_total': float(cart.get_total_price()),
-            'item_total': float(cart_item.get_item_total()) if quantity > 0 else 0,
+            'items': [
+                {
+                    'id': line.id,
+                    'item_id': line.menu_item.id,
+                    'name': line.menu_item.name,
+                    'quantity': line.quantity,
+                    'unit_price': float(line.unit_price),
+                    'item_total': float(line.get_item_total()),
+                }
+                for line in cart.get_lines()
+            ],
         })
     
     except Exception as e:
@@ -141,26 +189,37 @@ def checkout_view(request):
     Restaurant owners cannot checkout.
     """
     # Prevent restaurant owners from checkout
-    if hasattr(request.user, 'profile') and request.user.profile.role == 'restaurant_owner':
+    if request.account.is_restaurant_owner:
         messages.error(request, 'Restaurant owners cannot place orders.')
         return redirect('restaurant_dashboard')
     
-    cart = get_object_or_404(Cart, user=request.user)
+    cart = get_cart_store(request.user)
     
-    if not cart.items.exists():
+    if not cart.get_item_count():
         messages.warning(request, 'Your cart is empty!')
-        return redirect('restaurant_detail', restaurant_id=cart.restaurant.id if cart.restaurant else 1)
+        return redirect('restaurant_detail', restaurant_id=cart.restaurant_id or 1)
+    
+    # Reconcile prices that changed on the menu since items were added
+    prices_changed = bool(cart.reprice())
+    if prices_changed:
+        messages.info(request, PRICES_CHANGED_MESSAGE)
     
     if request.method == 'POST':
         form = CheckoutForm(request.POST)
-        if form.is_valid():
-            # Create order
-            order = create_order(request.user, cart, form.cleaned_data)
-            
-            # Clear cart
-            cart.items.all().delete()
-            cart.restaurant = None
-            cart.save()
+        if form.is_valid() and not prices_changed:
+            # Create order (also clears the cart in the same transaction)
+            try:
+                order = create_order(request.user, cart.materialize(), form.cleaned_data)
+            except CartPricesChanged:
+                # A price changed after the reprice above; never charge it unseen
+                cart.reprice()
+                messages.info(request, PRICES_CHANGED_MESSAGE)
+                return redirect('cart')
+            if order is None:
+                # A concurrent submit already turned this cart into an order
+                messages.warning(request, 'Your cart is empty!')
+                return redirect('order_history')
+            cart.discard()
             
             messages.success(request, f'Order placed successfully! Order ID: {order.order_number}')
             return redirect('order_detail', order_id=order.id)
@@ -169,6 +228,7 @@ def checkout_view(request):
     
     context = {
         'cart': cart,
+        'cart_items': cart.get_lines(),
         'form': form,
         'delivery_fee': 50,  # Fixed delivery fee
     }
@@ -179,48 +239,79 @@ def create_order(user, cart, cleaned_data):
     """
     Helper function to create an order from cart.
     Creates Order and OrderItem records, and generates order number.
+    Runs as one transaction with a fixed number of queries regardless of cart size:
+    the cart row is locked, lines are loaded with their prices in a single join,
+    order items are bulk inserted and the cart is cleared before committing.
+    Returns None without creating anything if the cart is empty once locked.
+    Lines are charged at the unit price the customer saw in the cart; raises
+    CartPricesChanged, creating nothing, if any differs from the menu price.
     """
     # Generate unique order number
     import uuid
     order_number = f"ORD{uuid.uuid4().hex[:10].upper()}"
     
-    restaurant = cart.restaurant
-    subtotal = cart.get_total_price()
-    delivery_fee = 50  # Fixed delivery fee
-    discount = 0  # Can be extended with coupon system
-    total_amount = subtotal + delivery_fee - discount
-    
-    # Create order
-    order = Order.objects.create(
-        user=user,
-        restaurant=restaurant,
-        order_number=order_number,
-        delivery_address=cleaned_data['delivery_address'],
-        payment_method=cleaned_data['payment_method'],
-        subtotal=subtotal,
-        delivery_fee=delivery_fee,
-        discount=discount,
-        total_amount=total_amount,
-        estimated_delivery=timezone.now() + timedelta(minutes=30)
-    )
-    
-    # Create order items from cart
-    for cart_item in cart.items.all():
-        OrderItem.objects.create(
-            order=order,
-            menu_item=cart_item.menu_item,
-            quantity=cart_item.quantity,
-            price=cart_item.menu_item.price,
-            total_price=cart_item.get_item_total()
+    with transaction.atomic():
+        cart = Cart.objects.select_for_update().get(pk=cart.pk)
+        cart_items = list(cart.items.select_related('menu_item'))
+        if not cart_items or cart.restaurant_id is None:
+            return None
+        
+        if any(item.unit_price != item.menu_item.price for item in cart_items):
+            raise CartPricesChanged('Some prices on the menu have changed.')
+        
+        subtotal = sum((item.get_item_total() for item in cart_items), Decimal('0'))
+        delivery_fee = 50  # Fixed delivery fee
+        discount = 0  # Can be extended with coupon system
+        total_amount = subtotal + delivery_fee - discount
+        
+        # Create order
+        order = Order.objects.create(
+            user=user,
+            restaurant_id=cart.restaurant_id,
+            order_number=order_number,
+            delivery_address=cleaned_data['delivery_address'],
+            payment_method=cleaned_data['payment_method'],
+            subtotal=subtotal,
+            delivery_fee=delivery_fee,
+            discount=discount,
+            total_amount=total_amount,
+            estimated_delivery=timezone.now() + timedelta(minutes=30)
         )
+        
+        # Create order items from cart
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                menu_item=cart_item.menu_item,
+                quantity=cart_item.quantity,
+                price=cart_item.unit_price,
+                total_price=cart_item.get_item_total(),
+            )
+            for cart_item in cart_items
+        ])
+        
+        cart.clear()
+        publish_order_event(order, 'order_created')
     
     return order
 
 
+def _order_detail_state(request, order_id):
+    """The fields of one of the user's orders that change what its page shows, or None."""
+    return Order.objects.filter(id=order_id, user=request.user).values('updated_at', 'review__rating').first()
+
+
+def _order_detail_etag(request, order_id):
+    state = _order_detail_state(request, order_id)
+    return page_etag(request, order_id, state['updated_at'], state['review__rating']) if state else None
+
+
 @login_required(login_url='login')
+@conditional_page(etag_func=_order_detail_etag)
 def order_detail_view(request, order_id):
     """
     Display order details and tracking information.
+    Conditional GETs for an unchanged order get a 304 without rendering.
     """
     try:
         order = Order.objects.get(id=order_id)
@@ -241,17 +332,112 @@ def order_detail_view(request, order_id):
     return render(request, 'orders/order_detail.html', context)
 
 
+def _order_status_etag(updated_at):
+    """Strong ETag for an order's tracking state, derived from updated_at."""
+    return f'"{updated_at.timestamp():.6f}"'
+
+
+def _get_order_status(request, order_id):
+    """Load just the tracking fields of one of the user's orders, or None."""
+    if not request.user.is_authenticated:
+        return None
+    return Order.objects.filter(id=order_id, user=request.user).values('status', 'updated_at').first()
+
+
+def _order_status_response(status, updated_at):
+    response = JsonResponse({
+        'status': status,
+        'status_display': dict(ORDER_STATUS_CHOICES).get(status, status),
+    })
+    response['ETag'] = _order_status_etag(updated_at)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+async def order_status_poll_view(request, order_id):
+    """
+    Long-poll endpoint for tracking an order's status (AJAX).
+    Send the last ETag in If-None-Match: if the order has not changed, the request is
+    held until a status event arrives or ORDER_STATUS_POLL_TIMEOUT passes (304).
+    Costs one small query per poll. Under WSGI the request is answered immediately
+    and a 304 carries Retry-After, so clients space out their polls instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        subscription = None
+    else:
+        # Subscribe before reading so a change between the two is not missed
+        subscription = get_broker().subscribe(order_channel(order_id))
+    
+    try:
+        order = await sync_to_async(_get_order_status)(request, order_id)
+        if order is None:
+            return JsonResponse({'success': False, 'message': 'Order not found.'}, status=404)
+        
+        etag = _order_status_etag(order['updated_at'])
+        if request.headers.get('If-None-Match') != etag:
+            return _order_status_response(order['status'], order['updated_at'])
+        
+        if subscription is not None:
+            event = await subscription.get(ORDER_STATUS_POLL_TIMEOUT)
+            if event is not None:
+                return _order_status_response(event['status'], datetime.fromisoformat(event['updated_at']))
+        
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        if subscription is None:
+            response['Retry-After'] = str(ORDER_STATUS_RETRY_AFTER)
+        return response
+    finally:
+        if subscription is not None:
+            subscription.close()
+
+
+def _encode_history_cursor(order):
+    """Encode an order's (created_at, id) position as an opaque cursor string."""
+    micros = (order.created_at - HISTORY_CURSOR_EPOCH) // timedelta(microseconds=1)
+    return f"{micros}-{order.id}"
+
+
+def _decode_history_cursor(cursor):
+    """Decode a cursor from _encode_history_cursor(). Returns None if it is malformed."""
+    try:
+        micros, order_id = (int(part) for part in cursor.split('-'))
+        return HISTORY_CURSOR_EPOCH + timedelta(microseconds=micros), order_id
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
 @login_required(login_url='login')
 def order_history_view(request):
     """
     Display customer's order history.
     Shows all past orders with status and details.
     Excludes orders archived by customer.
+    Paginated with a keyset cursor on (created_at, id) so deep pages cost the same
+    as the first one; restaurant, review and items are loaded up front.
     """
-    orders = request.user.orders.filter(is_archived_by_customer=False).order_by('-created_at')
+    orders = (
+        request.user.orders.filter(is_archived_by_customer=False)
+        .select_related('restaurant', 'review')
+        .prefetch_related('items')
+        .order_by('-created_at', '-id')
+    )
+    
+    position = _decode_history_cursor(request.GET.get('before'))
+    if position:
+        created_at, order_id = position
+        orders = orders.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id))
+    
+    orders = list(orders[:ORDER_HISTORY_PAGE_SIZE + 1])
+    next_cursor = None
+    if len(orders) > ORDER_HISTORY_PAGE_SIZE:
+        orders = orders[:ORDER_HISTORY_PAGE_SIZE]
+        next_cursor = _encode_history_cursor(orders[-1])
     
     context = {
         'orders': orders,
+        'next_cursor': next_cursor,
+        'is_first_page': position is None,
     }
     return render(request, 'orders/order_history.html', context)
 
@@ -281,24 +467,24 @@ def delete_order_view(request, order_id):
 @require_http_methods(["POST"])
 def update_order_status_view(request, order_id):
     """
-    Update order status (admin/restaurant owner only).
+    Update order status (restaurant owner only).
+    The change goes through the order state service as one conditional UPDATE.
     """
-    order = get_object_or_404(Order, id=order_id)
+    restaurant_id = request.account.restaurant_id
     
-    # Only restaurant owner or admin can update
-    if request.user != order.restaurant.owner:
+    # Only the restaurant owner can update; transitions are scoped to their restaurant
+    if restaurant_id is None:
         messages.error(request, 'You do not have permission to update this order.')
         return redirect('order_detail', order_id=order_id)
     
     new_status = request.POST.get('status')
-    valid_statuses = ['placed', 'confirmed', 'preparing', 'ready', 'out_for_delivery', 'delivered', 'cancelled']
     
-    if new_status in valid_statuses:
-        order.status = new_status
-        if new_status == 'delivered':
-            order.payment_status = 'completed'
-        order.save()
-        messages.success(request, f'Order status updated to {order.get_status_display()}')
+    if new_status not in ORDER_TRANSITIONS:
+        messages.error(request, 'Invalid status.')
+    elif transition_order(order_id, new_status, restaurant_id):
+        messages.success(request, f'Order status updated to {dict(ORDER_STATUS_CHOICES)[new_status]}')
+    else:
+        messages.error(request, 'This order cannot be moved to that status.')
     
     return redirect('order_detail', order_id=order_id)
 
@@ -328,15 +514,7 @@ def review_order_view(request, order_id):
             review.order = order
             review.restaurant = order.restaurant
             review.user = request.user
-            review.save()
-            
-            # Update restaurant rating (simple average)
-            restaurant = order.restaurant
-            all_reviews = restaurant.reviews.all()
-            avg_rating = sum(r.rating for r in all_reviews) / len(all_reviews)
-            restaurant.rating = avg_rating
-            restaurant.review_count = len(all_reviews)
-            restaurant.save()
+            review.save()  # Restaurant rating is updated by the Review signals
             
             messages.success(request, 'Thank you for your review!')
             return redirect('order_history')
@@ -350,15 +528,55 @@ def review_order_view(request, order_id):
     return render(request, 'orders/review.html', context)
 
 
+@login_required(login_url='login')
+@require_http_methods(["POST"])
+def reorder_view(request, order_id):
+    """
+    Rebuild the cart from one of the customer's past orders.
+    Replaces the cart with the order's items in one atomic step of the cart store
+    (bulk inserted lines in one transaction, or one locked cache write) at today's
+    menu prices, leaves out items that are no longer available and sends the customer
+    to the cart with a summary.
+    """
+    if request.account.is_restaurant_owner:
+        messages.error(request, 'Restaurant owners cannot place orders.')
+        return redirect('restaurant_dashboard')
+    
+    order = get_object_or_404(Order.objects.select_related('restaurant'), id=order_id, user=request.user)
+    if not order.restaurant.is_verified:
+        messages.error(request, f'{order.restaurant.name} is not taking orders right now.')
+        return redirect('order_detail', order_id=order.id)
+    
+    order_items = list(order.items.select_related('menu_item'))
+    available = [item for item in order_items if item.menu_item.is_available]
+    if not available:
+        messages.error(request, 'None of the items from this order are available right now.')
+        return redirect('order_detail', order_id=order.id)
+    
+    cart = get_cart_store(request.user)
+    try:
+        cart.replace_lines({item.menu_item_id: item.quantity for item in available})
+    except CartError as e:
+        messages.error(request, str(e))
+        return redirect('order_detail', order_id=order.id)
+    
+    messages.success(request, f'Added {len(available)} items from order {order.order_number} to your cart.')
+    unavailable = [item.menu_item.name for item in order_items if not item.menu_item.is_available]
+    if unavailable:
+        messages.warning(request, f'Not available right now: {", ".join(unavailable)}.')
+    repriced = [item.menu_item.name for item in available if item.price != item.menu_item.price]
+    if repriced:
+        messages.info(request, f'Prices have changed since this order for: {", ".join(repriced)}.')
+    return redirect('cart')
+
+
 @login_required(login_url='login')
 @require_http_methods(["POST"])
 def clear_cart_view(request):
     """
     Clear entire shopping cart.
     """
-    cart = get_object_or_404(Cart, user=request.user)
-    cart.items.all().delete()
-    cart.restaurant = None
-    cart.save()
+    cart = get_cart_store(request.user)
+    cart.clear()
     messages.success(request, 'Cart cleared.')
     return redirect('cart')
@@ -4,23 +4,51 @@ Registers models to be manageable via Django admin interface.
 """
 
 from django.contrib import admin
-from .models import Restaurant, Category, MenuItem
+from .models import Restaurant, OpeningInterval, CityFacet, Category, MenuItem, MediaBlob
+
+class OpeningIntervalInline(admin.TabularInline):
+    """Per-day opening hours; rebuilt from the daily hours when those change."""
+    model = OpeningInterval
+    extra = 0
+    fields = ('weekday', 'opens_at', 'closes_at')
 
 @admin.register(Restaurant)
 class RestaurantAdmin(admin.ModelAdmin):
     """Admin interface for restaurants."""
+    inlines = (OpeningIntervalInline,)
     list_display = ('name', 'owner', 'city', 'rating', 'is_verified', 'is_open')
-    list_filter = ('city', 'is_verified', 'is_open', 'created_at')
+    list_filter = ('city', 'is_verified', 'is_open', 'is_pure_veg', 'created_at')
     search_fields = ('name', 'owner__username', 'city')
-    readonly_fields = ('created_at', 'updated_at', 'rating')
+    readonly_fields = (
+        'created_at', 'updated_at', 'geohash', 'rating', 'review_count', 'rating_sum',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+    )
     fieldsets = (
-        ('Basic Information', {'fields': ('owner', 'name', 'description', 'image')}),
+        ('Basic Information', {'fields': ('owner', 'name', 'description', 'image', 'is_pure_veg')}),
         ('Contact Information', {'fields': ('address', 'city', 'phone', 'email')}),
+        ('Location', {'fields': ('latitude', 'longitude', 'geohash')}),
         ('Operating Hours', {'fields': ('opening_time', 'closing_time', 'is_open')}),
         ('Verification & Rating', {'fields': ('is_verified', 'rating', 'review_count')}),
+        ('Rating Breakdown', {'fields': (
+            'rating_sum', 'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+        )}),
         ('Timestamps', {'fields': ('created_at', 'updated_at')}),
     )
 
+@admin.register(CityFacet)
+class CityFacetAdmin(admin.ModelAdmin):
+    """Read-only view of the per-city counts behind the restaurant list filters."""
+    list_display = ('city', 'restaurant_count', 'pure_veg_count', 'open_count')
+    search_fields = ('city',)
+    readonly_fields = ('city', 'restaurant_count', 'pure_veg_count', 'open_count')
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    """Read-only view of deduplicated uploads and how many images use each."""
+    list_display = ('name', 'size', 'ref_count', 'created_at')
+    search_fields = ('name',)
+    readonly_fields = ('name', 'size', 'ref_count', 'created_at')
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     """Admin interface for food categories."""
@@ -5,3 +5,7 @@ class RestaurantsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'restaurants'
     verbose_name = 'Restaurants & Menu'
+
+    def ready(self):
+        from .search import select_search_backend
+        select_search_backend()
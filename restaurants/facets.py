@@ -0,0 +1,49 @@
+"""
+Restaurant list facets for the restaurants app.
+Reads the per-city counts kept in CityFacet so the list page can show its city,
+pure veg and "accepting orders" (is_open) filters, and paginate, without counting
+restaurants. Results filtered by opening hours ("Open Now") are counted live.
+"""
+
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from .models import CityFacet
+
+FACET_FIELDS = ('restaurant_count', 'pure_veg_count', 'open_count')
+
+
+class KnownCountPaginator(Paginator):
+    """Paginator given its object count up front, skipping the COUNT(*) query."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._known_count = count
+
+    @cached_property
+    def count(self):
+        return self._known_count
+
+
+def get_city_facets():
+    """Return the cities that have verified restaurants, with their counts."""
+    return list(CityFacet.objects.filter(restaurant_count__gt=0))
+
+
+def get_facet_totals(facets, city=''):
+    """Sum the counts of one city, or of every city when city is blank."""
+    selected = [facet for facet in facets if not city or facet.city == city]
+    return {field: sum(getattr(facet, field) for facet in selected) for field in FACET_FIELDS}
+
+
+def get_filtered_count(totals, pure_veg=False, open_now=False):
+    """
+    Number of restaurants matching the list filters, or None when the facets cannot
+    tell (pure veg and open together need a real count).
+    """
+    if pure_veg and open_now:
+        return None
+    if pure_veg:
+        return totals['pure_veg_count']
+    if open_now:
+        return totals['open_count']
+    return totals['restaurant_count']
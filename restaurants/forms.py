@@ -11,7 +11,7 @@ class RestaurantRegistrationForm(forms.ModelForm):
     """
     class Meta:
         model = Restaurant
-        fields = ('name', 'description', 'image', 'address', 'city', 'phone', 'email', 'opening_time', 'closing_time')
+        fields = ('name', 'description', 'image', 'address', 'city', 'phone', 'email', 'opening_time', 'closing_time', 'is_pure_veg')
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Restaurant Name'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 4, 'placeholder': 'Restaurant Description'}),
@@ -22,6 +22,7 @@ class RestaurantRegistrationForm(forms.ModelForm):
             'email': forms.EmailInput(attrs={'class': 'form-control', 'placeholder': 'Email'}),
             'opening_time': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
             'closing_time': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
+            'is_pure_veg': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
 
@@ -31,7 +32,7 @@ class RestaurantUpdateForm(forms.ModelForm):
     """
     class Meta:
         model = Restaurant
-        fields = ('name', 'description', 'image', 'address', 'city', 'phone', 'email', 'opening_time', 'closing_time', 'is_open')
+        fields = ('name', 'description', 'image', 'address', 'city', 'phone', 'email', 'opening_time', 'closing_time', 'is_open', 'is_pure_veg')
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
@@ -43,6 +44,7 @@ class RestaurantUpdateForm(forms.ModelForm):
             'opening_time': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
             'closing_time': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}),
             'is_open': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+            'is_pure_veg': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
 
@@ -84,3 +86,36 @@ class MenuItemForm(forms.ModelForm):
         if restaurant:
             # Filter categories for this restaurant only
             self.fields['category'].queryset = Category.objects.filter(restaurant=restaurant)
+        if 'image' in self.fields and self.instance.pk and not self.instance.image:
+            # Items created by a menu import have no image; editing them must not force an upload
+            self.fields['image'].required = False
+
+
+class MenuItemImportForm(MenuItemForm):
+    """
+    MenuItemForm rules for one row of a menu file (see restaurants/menu_io.py).
+    Categories are matched by name and images are managed one item at a time.
+    """
+    class Meta(MenuItemForm.Meta):
+        fields = ('name', 'description', 'price', 'is_vegetarian', 'is_available', 'preparation_time')
+
+
+class MenuImportForm(forms.Form):
+    """
+    Upload form for a CSV or JSON menu file.
+    """
+    menu_file = forms.FileField(widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv,.json'}))
+    dry_run = forms.BooleanField(
+        required=False, initial=True, label='Preview changes without saving',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+    hide_missing = forms.BooleanField(
+        required=False, label='Mark items missing from the file as unavailable',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+
+    def clean_menu_file(self):
+        menu_file = self.cleaned_data['menu_file']
+        if not menu_file.name.lower().endswith(('.csv', '.json')):
+            raise forms.ValidationError('Upload a .csv or .json file.')
+        return menu_file
@@ -0,0 +1,43 @@
+"""
+Opening hours arithmetic for the restaurants app.
+Opening intervals are stored as minutes since Monday 00:00 (minute of week) so
+"open now" and "opens soon" become range lookups on OpeningInterval. An interval
+that runs past midnight simply ends after the next day's start; one that runs past
+Sunday midnight ends beyond MINUTES_PER_WEEK, so lookups also try the same moment
+one week later. Times are read in the project's TIME_ZONE.
+"""
+
+from django.utils import timezone
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# Longest interval stored; bounds the range scans on start_minute
+MAX_INTERVAL_MINUTES = MINUTES_PER_DAY
+
+# How far ahead "opens soon" looks
+OPENS_SOON_MINUTES = 60
+
+
+def minute_of_week(weekday, time):
+    """Minute of week for a weekday (Monday is 0) and a time of day."""
+    return weekday * MINUTES_PER_DAY + time.hour * 60 + time.minute
+
+
+def interval_minutes(weekday, opens_at, closes_at):
+    """
+    Return (start_minute, end_minute) for hours on a weekday. Closing at or before
+    the opening time means the restaurant closes after midnight; equal times mean
+    it is open around the clock.
+    """
+    start = minute_of_week(weekday, opens_at)
+    end = minute_of_week(weekday, closes_at)
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+def current_minute_of_week(now=None):
+    """Minute of week for now (default: the current local time)."""
+    now = timezone.localtime(now)
+    return minute_of_week(now.weekday(), now)
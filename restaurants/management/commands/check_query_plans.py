@@ -0,0 +1,66 @@
+"""
+Management command to check the query plans of the hot view querysets.
+Runs EXPLAIN on the querysets behind the restaurant list, menu, owner dashboard and
+order history pages and fails if the database plans a full table scan for any of
+them, so a dropped or unusable index is caught before it reaches production.
+Plan checking understands SQLite's EXPLAIN QUERY PLAN output; on other databases
+the plans are only printed.
+
+Usage: python manage.py check_query_plans [--verbosity 2]
+"""
+
+import re
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from orders.bestsellers import bestsellers_queryset
+from orders.models import Order, Review
+from restaurants.models import Restaurant, MenuItem
+
+# "SCAN <table>" without "USING [COVERING] INDEX" reads every row of the table
+FULL_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING (?:COVERING )?INDEX)')
+
+
+def get_hot_querysets():
+    """Return (label, queryset) pairs mirroring the querysets the views run."""
+    # Plans do not depend on the parameter values, so placeholder ids are enough
+    restaurant_id, user_id = 1, 1
+    return [
+        ('home page restaurants', Restaurant.objects.filter(is_verified=True)[:8]),
+        ('restaurant list', Restaurant.objects.filter(is_verified=True)),
+        ('restaurant list by city', Restaurant.objects.filter(is_verified=True, city='Mumbai')),
+        ('restaurants open now', Restaurant.objects.filter(is_verified=True).open_now()),
+        ('restaurants opening soon', Restaurant.objects.filter(is_verified=True).opening_soon().order_by('opens_in')),
+        ('restaurant menu', MenuItem.objects.filter(restaurant_id=restaurant_id, is_available=True)),
+        ('restaurant bestsellers', bestsellers_queryset(restaurant_id, date.today())[:5]),
+        ('restaurant reviews', Review.objects.filter(restaurant_id=restaurant_id)[:5]),
+        ('dashboard menu', MenuItem.objects.filter(restaurant_id=restaurant_id)),
+        ('dashboard recent orders', Order.objects.filter(restaurant_id=restaurant_id)[:10]),
+        ('order history', Order.objects.filter(
+            user_id=user_id, is_archived_by_customer=False,
+        ).order_by('-created_at', '-id')[:21]),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Fail if a hot view queryset is planned as a full table scan'
+
+    def handle(self, *args, **options):
+        check_plans = connection.vendor == 'sqlite'
+        if not check_plans:
+            self.stdout.write(self.style.WARNING(
+                f'Plan checks are only implemented for SQLite; printing {connection.vendor} plans only.'
+            ))
+
+        failures = []
+        for label, queryset in get_hot_querysets():
+            plan = queryset.explain()
+            scans = FULL_SCAN.findall(plan) if check_plans else []
+            if options['verbosity'] > 1 or scans:
+                self.stdout.write(f'{label}:\n{plan}\n')
+            if scans:
+                failures.append(f"{label} (full scan of {', '.join(scans)})")
+
+        if failures:
+            raise CommandError('Full table scans planned for: ' + '; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('No hot query is planned as a full table scan.'))
@@ -0,0 +1,22 @@
+"""
+Management command to recompute restaurant popularity scores.
+Blends each restaurant's Bayesian-smoothed rating, recent order volume and review
+count in one vectorized pass (see restaurants/popularity.py). Run it periodically,
+e.g. hourly from cron; the home page and restaurant list only read the stored score.
+
+Usage: python manage.py compute_popularity
+"""
+
+from django.core.management.base import BaseCommand
+from restaurants.popularity import compute_popularity_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute restaurant popularity scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        changed = compute_popularity_scores(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated popularity scores for {changed} restaurants.'))
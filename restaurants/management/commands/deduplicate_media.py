@@ -0,0 +1,74 @@
+"""
+Management command to move uploads made before content-addressed storage into it.
+Every restaurant image, menu item image and profile picture that is not yet a
+blob is stored under its content hash (one copy per unique file), the rows are
+pointed at the blob, and the old files are deleted. Run generate_image_renditions
+afterwards to give the blobs their renditions.
+
+Usage: python manage.py deduplicate_media [--dry-run]
+"""
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from accounts.models import UserProfile
+from foodcart.storage import ContentAddressedStorage, is_blob_name
+from restaurants.menu_cache import bump_menu_version
+from restaurants.models import MediaBlob, MenuItem, Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Move existing uploads into content-addressed storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be moved')
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError('The default storage is not foodcart.storage.ContentAddressedStorage.')
+
+        sources = (
+            (Restaurant, 'image', 'id'),
+            (MenuItem, 'image', 'restaurant_id'),
+            (UserProfile, 'profile_picture', None),
+        )
+        blobs, moved, missing = {}, 0, set()
+        restaurant_ids = set()
+        for model, field, restaurant_field in sources:
+            fields = ['pk', field] + ([restaurant_field] if restaurant_field else [])
+            rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).values_list(*fields)
+            for row in rows.iterator():
+                pk, name = row[0], row[1]
+                if is_blob_name(name) or name in missing:
+                    continue
+                if options['dry_run']:
+                    moved += 1
+                    continue
+                if name not in blobs:
+                    try:
+                        with default_storage.open(name) as original:
+                            blobs[name] = default_storage.save(name, original)
+                    except FileNotFoundError:
+                        missing.add(name)
+                        self.stderr.write(f'{name}: file not found')
+                        continue
+                else:
+                    # Each further row using the file is one more reference to its blob
+                    MediaBlob.add_reference(blobs[name], default_storage.size(blobs[name]))
+                with transaction.atomic():
+                    model.objects.filter(pk=pk).update(**{field: blobs[name]})
+                moved += 1
+                if restaurant_field:
+                    restaurant_ids.add(row[2])
+
+        for name in blobs:
+            default_storage.delete(name)
+        for restaurant_id in restaurant_ids:
+            bump_menu_version(restaurant_id)
+
+        if options['dry_run']:
+            self.stdout.write(f'{moved} images would be moved.')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Moved {moved} images into {len(set(blobs.values()))} blobs ({len(missing)} files missing).'
+            ))
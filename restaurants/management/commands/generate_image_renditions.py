@@ -0,0 +1,51 @@
+"""
+Management command to generate resized renditions of existing images.
+Covers restaurant images, menu item images and profile pictures uploaded before
+renditions existed, or whose renditions were lost. Images that already have
+renditions are skipped unless --force is given. Runs in the foreground.
+
+Usage: python manage.py generate_image_renditions [--force]
+"""
+
+from django.core.management.base import BaseCommand
+from accounts.models import UserProfile
+from foodcart.images import generate_renditions, get_renditions
+from restaurants.menu_cache import bump_menu_version
+from restaurants.models import MenuItem, Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/JPEG renditions of uploaded images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate renditions that already exist')
+
+    def handle(self, *args, **options):
+        sources = (
+            (Restaurant.objects.exclude(image=''), 'image', 'id'),
+            (MenuItem.objects.exclude(image=''), 'image', 'restaurant_id'),
+            (UserProfile.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True), 'profile_picture', None),
+        )
+        generated = failed = 0
+        restaurant_ids, seen = set(), set()
+        for queryset, field, restaurant_field in sources:
+            fields = [field] + ([restaurant_field] if restaurant_field else [])
+            for row in queryset.values(*fields).iterator():
+                name = row[field]
+                if name in seen or (not options['force'] and get_renditions(name) is not None):
+                    continue
+                seen.add(name)
+                try:
+                    generate_renditions(name)
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'{name}: {e}')
+                    continue
+                generated += 1
+                if restaurant_field:
+                    restaurant_ids.add(row[restaurant_field])
+
+        # Cached menu pages still point at the original files
+        for restaurant_id in restaurant_ids:
+            bump_menu_version(restaurant_id)
+        self.stdout.write(self.style.SUCCESS(f'Generated renditions for {generated} images ({failed} failed).'))
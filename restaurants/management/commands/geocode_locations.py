@@ -0,0 +1,42 @@
+"""
+Management command to geocode restaurants and delivery addresses that have no
+coordinates yet, such as rows created before locations were added. New and edited
+rows are geocoded on save; this backfills the rest outside any migration.
+
+Usage: python manage.py geocode_locations
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.models import Address
+from foodcart.geo import geohash_encode, get_geocoder
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Geocode restaurants and addresses that have no coordinates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def geocode(self, queryset, fields, batch_size):
+        """Geocode the rows of queryset from fields and return how many were located."""
+        geocoder = get_geocoder()
+        located = []
+        for row in queryset.filter(latitude__isnull=True).only('id', *fields).iterator():
+            point = geocoder.geocode(*(getattr(row, field) for field in fields))
+            if point is not None:
+                row.latitude, row.longitude = point
+                row.geohash = geohash_encode(*point)
+                located.append(row)
+        # bulk_update skips the pre_save geocoding receivers, which would look the rows up again
+        with transaction.atomic():
+            queryset.model.objects.bulk_update(located, ['latitude', 'longitude', 'geohash'], batch_size=batch_size)
+        return len(located)
+
+    def handle(self, *args, **options):
+        restaurants = self.geocode(Restaurant.objects.all(), ('address', 'city'), options['batch_size'])
+        addresses = self.geocode(
+            Address.objects.all(), ('street_address', 'city', 'postal_code'), options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Geocoded {restaurants} restaurants and {addresses} addresses.'))
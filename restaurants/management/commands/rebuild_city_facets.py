@@ -0,0 +1,29 @@
+"""
+Management command to rebuild the restaurant list's city facets from scratch.
+Recounts verified, pure veg and accepting-orders (is_open) restaurants per city
+with a single GROUP BY. Use it to repair drifted counts or after bulk updates that
+bypass model signals.
+
+Usage: python manage.py rebuild_city_facets
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from restaurants.models import CityFacet, Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-city restaurant counts for the restaurant list filters'
+
+    def handle(self, *args, **options):
+        rows = Restaurant.objects.filter(is_verified=True).values('city').annotate(
+            restaurant_count=Count('id'),
+            pure_veg_count=Count('id', filter=Q(is_pure_veg=True)),
+            open_count=Count('id', filter=Q(is_open=True)),
+        ).order_by()
+
+        with transaction.atomic():
+            CityFacet.objects.all().delete()
+            facets = CityFacet.objects.bulk_create([CityFacet(**row) for row in rows])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt facets for {len(facets)} cities.'))
@@ -0,0 +1,57 @@
+"""
+Management command to rebuild restaurant rating aggregates from scratch.
+Recomputes rating, review_count, rating_sum and the per-star counts for every
+restaurant from a single GROUP BY over reviews. Use it to repair drifted aggregates.
+
+Usage: python manage.py rebuild_ratings
+"""
+
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from orders.models import Review
+from restaurants.menu_cache import bump_menu_version
+from restaurants.models import Restaurant
+
+STAR_FIELDS = [f'rating_{stars}_count' for stars in range(1, 6)]
+
+
+class Command(BaseCommand):
+    help = 'Rebuild restaurant rating aggregates from reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        histograms = defaultdict(lambda: [0] * 5)
+        rows = Review.objects.values('restaurant_id', 'rating').annotate(n=Count('id')).order_by()
+        for row in rows:
+            histograms[row['restaurant_id']][row['rating'] - 1] = row['n']
+
+        restaurants = []
+        for restaurant in Restaurant.objects.only('id', *STAR_FIELDS, 'rating', 'rating_sum', 'review_count'):
+            histogram = histograms.get(restaurant.id, [0] * 5)
+            review_count = sum(histogram)
+            rating_sum = sum(stars * count for stars, count in enumerate(histogram, start=1))
+            for field, count in zip(STAR_FIELDS, histogram):
+                setattr(restaurant, field, count)
+            restaurant.review_count = review_count
+            restaurant.rating_sum = rating_sum
+            restaurant.rating = (
+                (Decimal(rating_sum) / review_count).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
+                if review_count else Decimal('0')
+            )
+            restaurants.append(restaurant)
+
+        with transaction.atomic():
+            Restaurant.objects.bulk_update(
+                restaurants,
+                ['rating', 'review_count', 'rating_sum', *STAR_FIELDS],
+                batch_size=options['batch_size'],
+            )
+            # bulk_update sends no signals; refresh the cached restaurant pages
+            for restaurant in restaurants:
+                bump_menu_version(restaurant.id)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {len(restaurants)} restaurants.'))
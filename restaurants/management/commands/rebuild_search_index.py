@@ -0,0 +1,33 @@
+"""
+Management command to rebuild the search indexes from scratch.
+Reindexes every restaurant's name, description, city, category and menu item
+names, and the dish search tokens of every menu item. Use it after loading data
+with bulk operations that bypass model signals.
+
+Usage: python manage.py rebuild_search_index
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from restaurants.models import MenuItem
+from restaurants.search import get_search_backend, index_menu_items
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the restaurant and dish search indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        with transaction.atomic():
+            backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the restaurant index with {type(backend).__name__}.'))
+
+        batch_size = options['batch_size']
+        item_ids = list(MenuItem.objects.values_list('id', flat=True))
+        for start in range(0, len(item_ids), batch_size):
+            with transaction.atomic():
+                index_menu_items(MenuItem.objects.filter(id__in=item_ids[start:start + batch_size]).only('id', 'name'))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt dish tokens for {len(item_ids)} menu items.'))
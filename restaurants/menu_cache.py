@@ -0,0 +1,90 @@
+"""
+Menu caching for the restaurants app.
+Each restaurant has a menu version token kept in the cache. Rendered menu pages
+are cached under the restaurant id, its current version and the day (the embedded
+bestseller lists roll forward daily), and the receivers in
+restaurants/models.py and orders/models.py bump the version whenever the
+restaurant, its categories, menu items or reviews change. A bumped version is
+never looked up again, so stale copies are simply left to expire.
+
+Every menu version bump also bumps a single restaurant list version, which the
+restaurant list uses to answer conditional GETs. Versions are time.time_ns()
+values, so they double as Last-Modified times.
+
+With several worker processes the cache must be shared (e.g. Redis); a per-process
+locmem cache would only invalidate the worker that handled the write.
+"""
+
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.timezone import get_current_timezone
+
+
+def get_menu_cache():
+    return caches[getattr(settings, 'MENU_CACHE_ALIAS', 'default')]
+
+
+LIST_VERSION_KEY = 'restaurant_list_version'
+
+
+def menu_version_key(restaurant_id):
+    return f'menu_version:{restaurant_id}'
+
+
+def _get_version(key):
+    cache = get_menu_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_menu_version(restaurant_id):
+    """Return the restaurant's current menu version, starting one if needed."""
+    return _get_version(menu_version_key(restaurant_id))
+
+
+def get_list_version():
+    """Return the version of the restaurant list as a whole; changes with any menu version."""
+    return _get_version(LIST_VERSION_KEY)
+
+
+def version_modified_at(version):
+    """The time a version was started, for Last-Modified headers."""
+    return datetime.fromtimestamp(version / 1e9, tz=timezone.utc)
+
+
+def bump_menu_version(restaurant_id):
+    """
+    Invalidate every cached copy of a restaurant's menu once the current
+    transaction commits, so a concurrent request cannot cache the old rows
+    under the new version.
+    """
+    def bump():
+        version = time.time_ns()
+        get_menu_cache().set_many({menu_version_key(restaurant_id): version, LIST_VERSION_KEY: version}, None)
+
+    transaction.on_commit(bump)
+
+
+def menu_modified_at(version, day):
+    """Last-Modified of a menu rendered on a day: its version's start or that midnight, if later."""
+    midnight = datetime.combine(day, datetime.min.time(), tzinfo=get_current_timezone())
+    return max(version_modified_at(version), midnight)
+
+
+def menu_page_key(restaurant_id, version, day):
+    return f'menu_page:{restaurant_id}:{version}:{day}'
+
+
+def bump_list_version():
+    """Invalidate conditional GETs of the restaurant list alone, e.g. after re-ranking."""
+    transaction.on_commit(lambda: get_menu_cache().set(LIST_VERSION_KEY, time.time_ns(), None))
+
+
+def menu_document_key(restaurant_id, version, day):
+    return f'menu_document:{restaurant_id}:{version}:{day}'
@@ -0,0 +1,299 @@
+"""
+Bulk menu import and export for the restaurants app.
+A menu file has one row per menu item (CSV with a header row, or a JSON array of
+objects) with the columns in MENU_COLUMNS; a row with a category but no item name
+just declares the category, and a blank category_description keeps the current
+one. Rows are validated with CategoryForm and MenuItemForm rules, matched to the
+existing menu by category and item name, and applied with bulk_create/bulk_update
+in a single transaction, so nothing changes unless the whole file is valid.
+Imported items have no image until one is uploaded from the dashboard.
+
+Bulk writes skip model signals, so apply_menu_import() refreshes the search
+indexes and the cached menu itself.
+"""
+
+import csv
+import io
+import json
+from django.db import transaction
+from .forms import CategoryForm, MenuItemImportForm
+from .menu_cache import bump_menu_version
+from .models import Category, MenuItem
+from .search import index_menu_items, schedule_reindex
+
+MENU_COLUMNS = (
+    'category', 'category_description', 'name', 'description',
+    'price', 'is_vegetarian', 'is_available', 'preparation_time',
+)
+ITEM_FIELDS = ('name', 'description', 'price', 'is_vegetarian', 'is_available', 'preparation_time')
+BOOLEAN_VALUES = {
+    'true': True, 'yes': True, 'y': True, '1': True,
+    'false': False, 'no': False, 'n': False, '0': False,
+}
+
+# Rows per INSERT/UPDATE statement
+IMPORT_BATCH_SIZE = 500
+
+# Most rows an import may contain
+IMPORT_MAX_ROWS = 5000
+
+
+class MenuImportError(Exception):
+    """The menu file as a whole cannot be read."""
+
+
+class MenuImportReport:
+    """What an import changed (or would change), item by item."""
+
+    def __init__(self):
+        self.created_categories = []
+        self.updated_categories = []
+        self.created_items = []
+        self.updated_items = []  # (label, [changed fields])
+        self.unchanged_count = 0
+        self.missing_items = []
+        self.hidden_count = 0
+        self.errors = []  # (row number, message)
+        self.applied = False
+
+    @property
+    def has_changes(self):
+        return bool(
+            self.created_categories or self.updated_categories or self.created_items
+            or self.updated_items or self.hidden_count
+        )
+
+
+def read_menu_rows(uploaded_file):
+    """
+    Yield (row number, row dict) from an uploaded CSV or JSON menu file. CSV is
+    read a line at a time; JSON has to be parsed whole.
+    """
+    if uploaded_file.name.lower().endswith('.json'):
+        try:
+            rows = json.load(io.TextIOWrapper(uploaded_file, encoding='utf-8-sig'))
+        except (UnicodeDecodeError, ValueError) as e:
+            raise MenuImportError(f'Invalid JSON: {e}')
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise MenuImportError('A JSON menu must be a list of objects.')
+        yield from enumerate(rows, start=1)
+        return
+
+    reader = csv.DictReader(io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline=''))
+    try:
+        if reader.fieldnames is None or 'name' not in reader.fieldnames:
+            raise MenuImportError(f'The CSV header must include: {", ".join(MENU_COLUMNS)}.')
+        for row in reader:
+            # Row 1 is the header
+            yield reader.line_num, row
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise MenuImportError(f'Invalid CSV: {e}')
+
+
+def _clean_text(value):
+    return '' if value is None else str(value).strip()
+
+
+def _clean_boolean(value, default):
+    if isinstance(value, bool):
+        return value
+    value = _clean_text(value).lower()
+    if not value:
+        return default
+    if value not in BOOLEAN_VALUES:
+        raise ValueError(f'"{value}" is not yes/no')
+    return BOOLEAN_VALUES[value]
+
+
+def _item_key(category_name, item_name):
+    return (category_name.lower(), item_name.lower())
+
+
+def _item_label(category_name, item_name):
+    return f'{category_name} / {item_name}' if category_name else item_name
+
+
+def plan_menu_import(restaurant, rows, hide_missing=False):
+    """
+    Validate rows against a restaurant's menu without writing anything.
+    Returns (report, plan) where plan holds the unsaved objects for apply_menu_import().
+    """
+    report = MenuImportReport()
+    categories = {category.name.lower(): category for category in restaurant.categories.all()}
+    items = {
+        _item_key(item.category.name if item.category else '', item.name): item
+        for item in restaurant.menu_items.select_related('category')
+    }
+    new_categories, changed_categories = {}, {}
+    new_items, changed_items, seen = [], {}, set()
+
+    for count, (number, row) in enumerate(rows, start=1):
+        if count > IMPORT_MAX_ROWS:
+            raise MenuImportError(f'A menu file can have at most {IMPORT_MAX_ROWS} rows.')
+        category_name = _clean_text(row.get('category'))
+        item_name = _clean_text(row.get('name'))
+        if not category_name and not item_name:
+            continue
+
+        category = None
+        if category_name:
+            key = category_name.lower()
+            category = categories.get(key) or new_categories.get(key)
+            # A blank cell keeps the description from the menu or an earlier row
+            data = {
+                'name': category_name,
+                'description': _clean_text(row.get('category_description')) or (category.description if category else ''),
+            }
+            form = CategoryForm(data, instance=category)
+            if not form.is_valid():
+                report.errors.extend(
+                    (number, f'category {field}: {error}') for field, errors in form.errors.items() for error in errors
+                )
+                continue
+            if category is None:
+                category = form.save(commit=False)
+                category.restaurant = restaurant
+                new_categories[key] = category
+            elif 'description' in form.changed_data and category.pk:
+                changed_categories[key] = category
+        if not item_name:
+            continue
+
+        key = _item_key(category_name, item_name)
+        if key in seen:
+            report.errors.append((number, f'"{_item_label(category_name, item_name)}" appears more than once.'))
+            continue
+        seen.add(key)
+        item = items.get(key)
+        try:
+            data = {
+                'name': item_name,
+                'description': _clean_text(row.get('description')),
+                'price': _clean_text(row.get('price')),
+                'is_vegetarian': _clean_boolean(row.get('is_vegetarian'), item.is_vegetarian if item else False),
+                'is_available': _clean_boolean(row.get('is_available'), item.is_available if item else True),
+                'preparation_time': _clean_text(row.get('preparation_time')) or (item.preparation_time if item else 15),
+            }
+        except ValueError as e:
+            report.errors.append((number, str(e)))
+            continue
+        form = MenuItemImportForm(data, instance=item)
+        if not form.is_valid():
+            report.errors.extend(
+                (number, f'{field}: {error}') for field, errors in form.errors.items() for error in errors
+            )
+            continue
+        label = _item_label(category_name, item_name)
+        if item is None:
+            item = form.save(commit=False)
+            item.restaurant = restaurant
+            item.category = category
+            new_items.append(item)
+            report.created_items.append(label)
+        elif form.has_changed():
+            form.save(commit=False)
+            changed_items[item.pk] = item
+            report.updated_items.append((label, form.changed_data))
+        else:
+            report.unchanged_count += 1
+
+    missing = [item for key, item in items.items() if key not in seen]
+    report.missing_items = [_item_label(item.category.name if item.category else '', item.name) for item in missing]
+    hidden_ids = [item.pk for item in missing if item.is_available] if hide_missing else []
+    report.hidden_count = len(hidden_ids)
+    report.created_categories = [category.name for category in new_categories.values()]
+    report.updated_categories = [category.name for category in changed_categories.values()]
+    plan = {
+        'new_categories': list(new_categories.values()),
+        'changed_categories': list(changed_categories.values()),
+        'new_items': new_items,
+        'changed_items': list(changed_items.values()),
+        'hidden_ids': hidden_ids,
+    }
+    return report, plan
+
+
+def apply_menu_import(restaurant, plan):
+    """Write a planned import in one transaction and refresh what the bulk writes skip."""
+    with transaction.atomic():
+        Category.objects.bulk_create(plan['new_categories'], batch_size=IMPORT_BATCH_SIZE)
+        Category.objects.bulk_update(plan['changed_categories'], ['description'], batch_size=IMPORT_BATCH_SIZE)
+        if plan['new_categories']:
+            # Not every database returns primary keys from bulk_create
+            saved = {category.name: category for category in restaurant.categories.all()}
+            for item in plan['new_items']:
+                if item.category is not None and item.category.pk is None:
+                    item.category = saved[item.category.name]
+
+        MenuItem.objects.bulk_create(plan['new_items'], batch_size=IMPORT_BATCH_SIZE)
+        MenuItem.objects.bulk_update(plan['changed_items'], ITEM_FIELDS, batch_size=IMPORT_BATCH_SIZE)
+        if plan['hidden_ids']:
+            MenuItem.objects.filter(id__in=plan['hidden_ids']).update(is_available=False)
+
+        # The post_save receivers in restaurants/models.py do not run for bulk writes
+        if all(item.pk for item in plan['new_items']):
+            index_menu_items(plan['new_items'] + plan['changed_items'])
+        else:
+            index_menu_items(restaurant.menu_items.only('id', 'name'))
+        schedule_reindex(restaurant.id)
+        bump_menu_version(restaurant.id)
+
+
+def import_menu(restaurant, uploaded_file, dry_run=False, hide_missing=False):
+    """
+    Import a menu file into a restaurant's menu and return the report. Nothing is
+    written on a dry run or when any row is invalid.
+    """
+    report, plan = plan_menu_import(restaurant, read_menu_rows(uploaded_file), hide_missing=hide_missing)
+    if not dry_run and not report.errors and report.has_changes:
+        apply_menu_import(restaurant, plan)
+        report.applied = True
+    return report
+
+
+def iter_menu_rows(restaurant):
+    """Yield a restaurant's menu as rows of MENU_COLUMNS, category by category."""
+    items = restaurant.menu_items.select_related('category').order_by('category__name', 'name')
+    listed = set()
+    for item in items.iterator(chunk_size=IMPORT_BATCH_SIZE):
+        category = item.category
+        if category is not None:
+            listed.add(category.pk)
+        yield {
+            'category': category.name if category else '',
+            'category_description': category.description if category else '',
+            'name': item.name,
+            'description': item.description,
+            'price': str(item.price),
+            'is_vegetarian': item.is_vegetarian,
+            'is_available': item.is_available,
+            'preparation_time': item.preparation_time,
+        }
+    # Categories without items, so an export re-imports to the same menu
+    for category in restaurant.categories.exclude(pk__in=listed).order_by('name'):
+        yield {'category': category.name, 'category_description': category.description, 'name': ''}
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def stream_menu_csv(restaurant):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(MENU_COLUMNS)
+    for row in iter_menu_rows(restaurant):
+        yield writer.writerow([
+            ('yes' if value else 'no') if isinstance(value, bool) else value
+            for value in (row.get(column, '') for column in MENU_COLUMNS)
+        ])
+
+
+def stream_menu_json(restaurant):
+    separator = '[\n'
+    for row in iter_menu_rows(restaurant):
+        yield separator + json.dumps(row, ensure_ascii=False)
+        separator = ',\n'
+    yield '[]\n' if separator == '[\n' else '\n]\n'
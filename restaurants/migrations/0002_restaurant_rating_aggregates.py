@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:51
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    """Compute rating aggregates for existing restaurants from their reviews."""
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    Review = apps.get_model('orders', 'Review')
+    rows = Review.objects.values('restaurant_id', 'rating').annotate(n=Count('id')).order_by()
+    histograms = {}
+    for row in rows:
+        histograms.setdefault(row['restaurant_id'], [0] * 5)[row['rating'] - 1] = row['n']
+    for restaurant_id, histogram in histograms.items():
+        review_count = sum(histogram)
+        rating_sum = sum(stars * count for stars, count in enumerate(histogram, start=1))
+        Restaurant.objects.filter(id=restaurant_id).update(
+            review_count=review_count,
+            rating_sum=rating_sum,
+            rating=(Decimal(rating_sum) / review_count).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP),
+            **{f'rating_{stars}_count': count for stars, count in enumerate(histogram, start=1)},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0001_initial'),
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='is_verified',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+"""
+Create the SQLite FTS5 table behind restaurants.search.SQLiteFTSBackend and index
+the existing restaurants. Does nothing on other databases or SQLite builds without
+FTS5; restaurant search then uses BasicSearchBackend.
+"""
+
+from django.db import migrations
+
+FTS_TABLE = 'restaurants_restaurant_fts'
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if not cursor.fetchone()[0]:
+            return
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+            "name, description, city, categories, menu, prefix='2 3')"
+        )
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description, city, categories, menu) '
+            'SELECT r.id, r.name, r.description, r.city, '
+            "COALESCE((SELECT group_concat(c.name, ' ') FROM restaurants_category c WHERE c.restaurant_id = r.id), ''), "
+            "COALESCE((SELECT group_concat(m.name, ' ') FROM restaurants_menuitem m WHERE m.restaurant_id = r.id), '') "
+            'FROM restaurants_restaurant r'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:09
+
+import re
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of restaurants.search.dish_tokens() as of this migration, so later
+# tokenizer changes do not change what it does
+DISH_STOPWORDS = frozenset({
+    'a', 'an', 'and', 'any', 'around', 'at', 'best', 'by', 'food', 'for', 'from', 'get',
+    'i', 'in', 'me', 'my', 'near', 'nearby', 'of', 'on', 'or', 'order', 'some', 'the',
+    'to', 'want', 'with',
+})
+
+
+def dish_tokens(text):
+    return {
+        token[:50] for token in re.findall(r'\w+', text.lower())
+        if len(token) > 1 and token not in DISH_STOPWORDS
+    }
+
+
+def index_existing_menu_items(apps, schema_editor):
+    MenuItem = apps.get_model('restaurants', 'MenuItem')
+    MenuItemToken = apps.get_model('restaurants', 'MenuItemToken')
+    MenuItemToken.objects.bulk_create([
+        MenuItemToken(token=token, menu_item_id=item_id)
+        for item_id, name in MenuItem.objects.values_list('id', 'name').iterator()
+        for token in dish_tokens(name)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0004_restaurant_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuItemToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50)),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='restaurants.menuitem')),
+            ],
+            options={
+                'unique_together': {('token', 'menu_item')},
+            },
+        ),
+        migrations.RunPython(index_existing_menu_items, migrations.RunPython.noop),
+    ]
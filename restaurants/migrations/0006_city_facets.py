@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:11
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def build_city_facets(apps, schema_editor):
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    CityFacet = apps.get_model('restaurants', 'CityFacet')
+    rows = Restaurant.objects.filter(is_verified=True).values('city').annotate(
+        restaurant_count=Count('id'),
+        pure_veg_count=Count('id', filter=Q(is_pure_veg=True)),
+        open_count=Count('id', filter=Q(is_open=True)),
+    ).order_by()
+    CityFacet.objects.bulk_create([CityFacet(**row) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0005_menu_item_tokens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CityFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city', models.CharField(max_length=100, unique=True)),
+                ('restaurant_count', models.PositiveIntegerField(default=0)),
+                ('pure_veg_count', models.PositiveIntegerField(default=0)),
+                ('open_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'City Facets',
+                'ordering': ['city'],
+            },
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='is_pure_veg',
+            field=models.BooleanField(default=False, help_text='Serves only vegetarian food'),
+        ),
+        migrations.RunPython(build_city_facets, migrations.RunPython.noop),
+    ]
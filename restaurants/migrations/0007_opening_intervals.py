@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of restaurants.hours.interval_minutes() as of this migration, so later
+# changes to hours.py do not change what it does
+MINUTES_PER_DAY = 24 * 60
+
+
+def interval_minutes(weekday, opens_at, closes_at):
+    start = weekday * MINUTES_PER_DAY + opens_at.hour * 60 + opens_at.minute
+    end = weekday * MINUTES_PER_DAY + closes_at.hour * 60 + closes_at.minute
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+def build_opening_intervals(apps, schema_editor):
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    OpeningInterval = apps.get_model('restaurants', 'OpeningInterval')
+    intervals = []
+    for restaurant_id, opens_at, closes_at in Restaurant.objects.values_list('id', 'opening_time', 'closing_time').iterator():
+        for weekday in range(7):
+            start_minute, end_minute = interval_minutes(weekday, opens_at, closes_at)
+            intervals.append(OpeningInterval(
+                restaurant_id=restaurant_id, weekday=weekday, opens_at=opens_at, closes_at=closes_at,
+                start_minute=start_minute, end_minute=end_minute,
+            ))
+    OpeningInterval.objects.bulk_create(intervals, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0006_city_facets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('opens_at', models.TimeField()),
+                ('closes_at', models.TimeField(help_text='At or before the opening time means after midnight')),
+                ('start_minute', models.PositiveIntegerField(editable=False)),
+                ('end_minute', models.PositiveIntegerField(editable=False)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_intervals', to='restaurants.restaurant')),
+            ],
+            options={
+                'ordering': ['weekday', 'opens_at'],
+                'indexes': [models.Index(fields=['start_minute', 'end_minute', 'restaurant'], name='openinginterval_minute_idx')],
+            },
+        ),
+        migrations.RunPython(build_opening_intervals, migrations.RunPython.noop),
+    ]
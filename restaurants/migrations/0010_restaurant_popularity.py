@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0009_media_blobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='restaurant',
+            options={'ordering': ['-popularity_score', '-rating']},
+        ),
+        migrations.RemoveIndex(
+            model_name='restaurant',
+            name='restaurant_verified_rating_idx',
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='popularity_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(condition=models.Q(('is_verified', True)), fields=['-popularity_score', '-rating'], name='restaurant_popularity_idx'),
+        ),
+    ]
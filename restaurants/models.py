@@ -4,7 +4,79 @@ Handles restaurant registration, categories, and food items.
 """
 
 from django.db import models
+from django.db.models import Case, ExpressionWrapper, F, FloatField, OuterRef, Q, Subquery, When
+from django.db.models.functions import Cast, Greatest, Round
 from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from accounts.account_cache import bump_account_version
+from foodcart.geo import bounding_box, covering_geohashes, geohash_encode, get_geocoder, haversine_km
+from foodcart.images import schedule_renditions
+from foodcart.storage import release_file, release_replaced_file, remember_replaced_file
+from .hours import (
+    MAX_INTERVAL_MINUTES, MINUTES_PER_WEEK, OPENS_SOON_MINUTES, current_minute_of_week, interval_minutes,
+)
+from .menu_cache import bump_menu_version
+from .search import get_search_backend, index_menu_items, schedule_reindex
+
+class RestaurantQuerySet(models.QuerySet):
+    """Opening hours lookups, backed by the OpeningInterval minute-of-week index."""
+
+    def open_now(self, now=None):
+        """Restaurants accepting orders and inside one of their opening intervals."""
+        minute = current_minute_of_week(now)
+        return self.filter(
+            is_open=True,
+            id__in=OpeningInterval.objects.open_at(minute).values('restaurant_id'),
+        )
+
+    def nearby(self, latitude, longitude, km):
+        """
+        Restaurants within km of a point, nearest first, each with distance_km set.
+        Geohash cell ranges and a bounding box narrow the rows in SQL; the exact
+        haversine distance is only computed for those survivors.
+        """
+        min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, km)
+        cells = Q()
+        for prefix in covering_geohashes(min_lat, max_lat, min_lng, max_lng):
+            # '~' sorts after every geohash character
+            cells |= Q(geohash__gte=prefix, geohash__lt=prefix + '~')
+        candidates = self.filter(
+            cells,
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lng, max_lng),
+        )
+        restaurants = []
+        for restaurant in candidates:
+            distance = haversine_km(latitude, longitude, restaurant.latitude, restaurant.longitude)
+            if distance <= km:
+                restaurant.distance_km = round(distance, 2)
+                restaurants.append(restaurant)
+        restaurants.sort(key=lambda restaurant: restaurant.distance_km)
+        return restaurants
+
+    def opening_soon(self, now=None, within=OPENS_SOON_MINUTES):
+        """
+        Restaurants that are closed now but open within the next `within` minutes,
+        annotated with opens_in (minutes until they open).
+        """
+        minute = current_minute_of_week(now)
+        upcoming = OpeningInterval.objects.opening_within(minute, within)
+        wait = Case(
+            When(start_minute__gt=minute, then=F('start_minute') - minute),
+            default=F('start_minute') + MINUTES_PER_WEEK - minute,
+        )
+        return self.filter(
+            is_open=True,
+            id__in=upcoming.values('restaurant_id'),
+        ).exclude(
+            id__in=OpeningInterval.objects.open_at(minute).values('restaurant_id'),
+        ).annotate(
+            opens_in=Subquery(
+                upcoming.filter(restaurant=OuterRef('pk')).annotate(wait=wait).order_by('wait').values('wait')[:1]
+            ),
+        )
+
 
 class Restaurant(models.Model):
     """
@@ -20,25 +92,209 @@ class Restaurant(models.Model):
     phone = models.CharField(max_length=15)
     email = models.EmailField()
     
+    # Location, geocoded from address and city (see foodcart/geo.py)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
+    
     # Rating and reviews
+    # rating is derived from rating_sum / review_count; the per-star counts form a histogram.
+    # All of them are maintained incrementally by record_rating_change().
     rating = models.DecimalField(max_digits=2, decimal_places=1, default=0)
     review_count = models.IntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    
+    # Blend of smoothed rating, recent orders and review count, recomputed in batches
+    # by the compute_popularity command (see restaurants/popularity.py)
+    popularity_score = models.FloatField(default=0, editable=False)
     
     # Operating hours
     opening_time = models.TimeField(default='09:00')
     closing_time = models.TimeField(default='22:00')
     is_open = models.BooleanField(default=True)
+    is_pure_veg = models.BooleanField(default=False, help_text="Serves only vegetarian food")
     
     # Metadata
     is_verified = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RestaurantQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
+    def sync_opening_hours(self):
+        """Replace the weekly schedule with opening_time - closing_time every day."""
+        opens_at = self._meta.get_field('opening_time').to_python(self.opening_time)
+        closes_at = self._meta.get_field('closing_time').to_python(self.closing_time)
+        intervals = [
+            OpeningInterval(restaurant=self, weekday=weekday, opens_at=opens_at, closes_at=closes_at)
+            for weekday in range(7)
+        ]
+        for interval in intervals:
+            # bulk_create skips save(), which derives the minute-of-week range
+            interval.compute_minutes()
+        self.opening_intervals.all().delete()
+        OpeningInterval.objects.bulk_create(intervals)
+
+    def get_rating_histogram(self):
+        """Return [(stars, count), ...] from 5 stars down to 1."""
+        return [(stars, getattr(self, f'rating_{stars}_count')) for stars in range(5, 0, -1)]
+
+    @classmethod
+    def record_rating_change(cls, restaurant_id, added=None, removed=None):
+        """
+        Atomically fold a new and/or withdrawn star rating into a restaurant's aggregates.
+        Issues a single UPDATE with F-expressions, so concurrent reviews never lose updates
+        and the cost does not depend on how many reviews the restaurant already has.
+        """
+        sum_delta = (added or 0) - (removed or 0)
+        count_delta = (1 if added else 0) - (1 if removed else 0)
+        updates = {}
+        if added:
+            updates[f'rating_{added}_count'] = F(f'rating_{added}_count') + 1
+        if removed:
+            updates[f'rating_{removed}_count'] = F(f'rating_{removed}_count') - 1
+        if added and removed and added == removed:
+            updates.pop(f'rating_{added}_count')
+
+        new_sum = F('rating_sum') + sum_delta
+        new_count = F('review_count') + count_delta
+        updates.update(
+            rating_sum=new_sum,
+            review_count=new_count,
+            rating=Case(
+                When(
+                    review_count__gt=-count_delta,
+                    then=Round(ExpressionWrapper(Cast(new_sum, FloatField()) / new_count, output_field=FloatField()), 1),
+                ),
+                default=0.0,
+                output_field=FloatField(),
+            ),
+        )
+        cls.objects.filter(id=restaurant_id).update(**updates)
+
     class Meta:
-        ordering = ['-rating']
+        ordering = ['-popularity_score', '-rating']
+        indexes = [
+            # Verified restaurant listings, most popular first. Partial rather than leading with
+            # is_verified: SQLite can't seek on a boolean compared as a bare column.
+            models.Index(
+                fields=['-popularity_score', '-rating'],
+                condition=Q(is_verified=True),
+                name='restaurant_popularity_idx',
+            ),
+        ]
+
+
+class OpeningIntervalQuerySet(models.QuerySet):
+
+    def open_at(self, minute):
+        """Intervals covering a minute of week, as bounded range scans on start_minute."""
+        query = Q()
+        # Intervals that started late on Sunday show up a week later
+        for moment in (minute, minute + MINUTES_PER_WEEK):
+            query |= Q(start_minute__range=(moment - MAX_INTERVAL_MINUTES, moment), end_minute__gt=moment)
+        return self.filter(query)
+
+    def opening_within(self, minute, within):
+        """Intervals starting after minute and at most `within` minutes later."""
+        query = Q(start_minute__gt=minute, start_minute__lte=minute + within)
+        if minute + within >= MINUTES_PER_WEEK:
+            query |= Q(start_minute__lte=minute + within - MINUTES_PER_WEEK)
+        return self.filter(query)
+
+
+class OpeningInterval(models.Model):
+    """
+    One opening interval of a restaurant's weekly schedule.
+    start_minute/end_minute are derived on save (see restaurants/hours.py); end_minute
+    may exceed a day or a week when the restaurant closes after midnight.
+    """
+    WEEKDAY_CHOICES = (
+        (0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'),
+        (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday'),
+    )
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='opening_intervals')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    opens_at = models.TimeField()
+    closes_at = models.TimeField(help_text="At or before the opening time means after midnight")
+    start_minute = models.PositiveIntegerField(editable=False)
+    end_minute = models.PositiveIntegerField(editable=False)
+
+    objects = OpeningIntervalQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.get_weekday_display()} {self.opens_at:%H:%M}-{self.closes_at:%H:%M}"
+
+    def compute_minutes(self):
+        self.start_minute, self.end_minute = interval_minutes(self.weekday, self.opens_at, self.closes_at)
+
+    def save(self, *args, **kwargs):
+        self.compute_minutes()
+        super().save(*args, **kwargs)
+
+    class Meta:
+        ordering = ['weekday', 'opens_at']
+        indexes = [
+            # "Open now" / "opens soon" range lookups, covering the restaurant id
+            models.Index(fields=['start_minute', 'end_minute', 'restaurant'], name='openinginterval_minute_idx'),
+        ]
+
+
+class CityFacet(models.Model):
+    """
+    Per-city counts of verified restaurants, used for the restaurant list filters.
+    Maintained incrementally by the Restaurant receivers below so the list page
+    never aggregates over the restaurant table. open_count counts the owner's
+    "accepting orders" switch (is_open), not restaurants inside their opening hours
+    right now; the "Open Now" hours filter is not counted.
+    """
+    city = models.CharField(max_length=100, unique=True)
+    restaurant_count = models.PositiveIntegerField(default=0)
+    pure_veg_count = models.PositiveIntegerField(default=0)
+    open_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.city} ({self.restaurant_count})"
+
+    @staticmethod
+    def facet_flags(restaurant):
+        """Return (city, counters) saying which counts a restaurant adds to its city."""
+        if not restaurant.is_verified:
+            return restaurant.city, {}
+        counters = {'restaurant_count': 1}
+        if restaurant.is_pure_veg:
+            counters['pure_veg_count'] = 1
+        if restaurant.is_open:
+            counters['open_count'] = 1
+        return restaurant.city, counters
+
+    @classmethod
+    def record_change(cls, city, counters, sign):
+        """
+        Add (sign=1) or remove (sign=-1) a restaurant's counters in a single UPDATE.
+        Counts never go below zero; if they drift (e.g. after bulk updates that skip
+        the receivers), rebuild_city_facets recounts them.
+        """
+        if not counters:
+            return
+        if sign > 0:
+            cls.objects.get_or_create(city=city)
+        cls.objects.filter(city=city).update(**{
+            field: Greatest(F(field) + sign * delta, 0) for field, delta in counters.items()
+        })
+
+    class Meta:
+        verbose_name_plural = "City Facets"
+        ordering = ['city']
 
 
 class Category(models.Model):
@@ -84,3 +340,230 @@ class MenuItem(models.Model):
 
     class Meta:
         ordering = ['category', 'name']
+        indexes = [
+            # A restaurant's menu in menu order (is_available is filtered while walking it)
+            models.Index(fields=['restaurant', 'category', 'name'], name='menuitem_menu_idx'),
+        ]
+
+
+class MenuItemToken(models.Model):
+    """
+    Inverted index for dish search: one row per word in a menu item's name.
+    Maintained by the receivers below; see restaurants/search.py.
+    """
+    token = models.CharField(max_length=50)
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='tokens')
+
+    def __str__(self):
+        return f"{self.token} -> {self.menu_item_id}"
+
+    class Meta:
+        # Also serves token lookups and prefix range scans
+        unique_together = ('token', 'menu_item')
+
+
+class MediaBlob(models.Model):
+    """
+    A unique uploaded file stored under its content hash by
+    foodcart.storage.ContentAddressedStorage, for every app's uploads, with the
+    number of image fields that use it. The file is removed when that reaches zero.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+    @classmethod
+    def add_reference(cls, name, size):
+        cls.objects.get_or_create(name=name, defaults={'size': size})
+        cls.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+    @classmethod
+    def remove_reference(cls, name):
+        """Drop one reference; returns True if it was the last one and the blob row is gone."""
+        cls.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+        deleted, _ = cls.objects.filter(name=name, ref_count=0).delete()
+        return bool(deleted)
+
+    class Meta:
+        verbose_name_plural = "Media Blobs"
+
+
+# Signals to keep the restaurant search index in step with the searchable fields
+def _touches(update_fields, fields):
+    """Whether a save with update_fields may have changed any of fields."""
+    return update_fields is None or not fields.isdisjoint(update_fields)
+
+
+def _deletes_restaurant(origin):
+    """Whether a delete cascaded from a restaurant, whose index row goes with it."""
+    model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    return model is Restaurant
+
+
+@receiver(post_save, sender=Restaurant)
+def index_restaurant(sender, instance, update_fields=None, **kwargs):
+    if _touches(update_fields, {'name', 'description', 'city'}):
+        schedule_reindex(instance.id)
+
+
+@receiver(post_delete, sender=Restaurant)
+def unindex_restaurant(sender, instance, **kwargs):
+    get_search_backend().remove_restaurants([instance.id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=MenuItem)
+def reindex_menu_restaurant(sender, instance, update_fields=None, **kwargs):
+    """Category and menu item names are part of their restaurant's search document."""
+    if _touches(update_fields, {'name', 'restaurant'}):
+        schedule_reindex(instance.restaurant_id)
+
+
+@receiver(post_save, sender=MenuItem)
+def index_menu_item_tokens(sender, instance, update_fields=None, **kwargs):
+    """Keep the dish search index current; tokens are deleted along with the item."""
+    if _touches(update_fields, {'name'}):
+        index_menu_items([instance])
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=MenuItem)
+def reindex_menu_restaurant_on_delete(sender, instance, origin=None, **kwargs):
+    if not _deletes_restaurant(origin):
+        schedule_reindex(instance.restaurant_id)
+
+
+# Signals to invalidate cached menu pages (review receivers live in orders/models.py)
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def invalidate_restaurant_menu(sender, instance, **kwargs):
+    bump_menu_version(instance.id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def invalidate_menu(sender, instance, **kwargs):
+    bump_menu_version(instance.restaurant_id)
+
+
+# Signals to generate resized renditions of new images (see foodcart/images.py)
+@receiver(post_save, sender=Restaurant)
+def render_restaurant_image(sender, instance, update_fields=None, **kwargs):
+    if _touches(update_fields, {'image'}):
+        schedule_renditions(instance.image, on_ready=lambda: bump_menu_version(instance.id))
+
+
+@receiver(post_save, sender=MenuItem)
+def render_menu_item_image(sender, instance, update_fields=None, **kwargs):
+    if _touches(update_fields, {'image'}):
+        schedule_renditions(instance.image, on_ready=lambda: bump_menu_version(instance.restaurant_id))
+
+
+# Signals to release content-addressed uploads that are replaced or deleted (see foodcart/storage.py)
+@receiver(pre_save, sender=Restaurant)
+@receiver(pre_save, sender=MenuItem)
+def remember_replaced_image(sender, instance, **kwargs):
+    remember_replaced_file(instance, 'image')
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=MenuItem)
+def release_replaced_image(sender, instance, **kwargs):
+    release_replaced_file(instance, 'image')
+
+
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_delete, sender=MenuItem)
+def release_deleted_image(sender, instance, **kwargs):
+    release_file(instance.image)
+
+
+# Signals to keep CityFacet counts and the opening schedule in step with restaurants
+@receiver(pre_save, sender=Restaurant)
+def remember_previous_state(sender, instance, **kwargs):
+    """Remember the stored facets, hours, location and owner of a restaurant that is being edited."""
+    instance._previous_facets = None
+    instance._previous_hours = None
+    instance._previous_location = None
+    instance._previous_owner_id = None
+    if instance.pk:
+        previous = Restaurant.objects.filter(pk=instance.pk).only(
+            'address', 'city', 'is_verified', 'is_pure_veg', 'is_open', 'opening_time', 'closing_time', 'owner',
+        ).first()
+        if previous is not None:
+            instance._previous_facets = CityFacet.facet_flags(previous)
+            instance._previous_hours = (previous.opening_time, previous.closing_time)
+            instance._previous_location = (previous.address, previous.city)
+            instance._previous_owner_id = previous.owner_id
+
+
+@receiver(pre_save, sender=Restaurant)
+def geocode_restaurant(sender, instance, update_fields=None, **kwargs):
+    """Geocode new or moved restaurants and keep the geohash in step with the coordinates."""
+    if not _touches(update_fields, {'address', 'city', 'latitude', 'longitude'}):
+        return
+    moved = getattr(instance, '_previous_location', None) != (instance.address, instance.city)
+    if moved or instance.latitude is None:
+        point = get_geocoder().geocode(instance.address, instance.city)
+        if point is not None:
+            instance.latitude, instance.longitude = point
+        elif moved:
+            instance.latitude = instance.longitude = None
+    if instance.latitude is not None and instance.longitude is not None:
+        instance.geohash = geohash_encode(instance.latitude, instance.longitude)
+    else:
+        instance.geohash = ''
+
+
+@receiver(post_save, sender=Restaurant)
+def apply_restaurant_facets(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_facets', None)
+    current = CityFacet.facet_flags(instance)
+    if previous == current:
+        return
+    if previous is not None:
+        CityFacet.record_change(*previous, sign=-1)
+    CityFacet.record_change(*current, sign=1)
+
+
+@receiver(post_delete, sender=Restaurant)
+def withdraw_restaurant_facets(sender, instance, **kwargs):
+    CityFacet.record_change(*CityFacet.facet_flags(instance), sign=-1)
+
+
+@receiver(post_save, sender=Restaurant)
+def sync_opening_hours(sender, instance, created, **kwargs):
+    """
+    Give new restaurants a daily schedule from their opening and closing times, and
+    rebuild it when those change. Per-day intervals edited in the admin are kept
+    until the daily hours are changed again.
+    """
+    previous = getattr(instance, '_previous_hours', None)
+    if created or previous is None:
+        instance.sync_opening_hours()
+        return
+    field = Restaurant._meta.get_field
+    current = (field('opening_time').to_python(instance.opening_time), field('closing_time').to_python(instance.closing_time))
+    if current != previous:
+        instance.sync_opening_hours()
+
+
+# Signals to refresh the owned restaurant cached in owners' sessions (accounts/account_cache.py)
+@receiver(post_save, sender=Restaurant)
+def invalidate_owner_account(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_owner_id', None)
+    if previous != instance.owner_id:
+        bump_account_version(instance.owner_id)
+        if previous is not None:
+            bump_account_version(previous)
+
+
+@receiver(post_delete, sender=Restaurant)
+def invalidate_deleted_owner_account(sender, instance, **kwargs):
+    bump_account_version(instance.owner_id)
@@ -0,0 +1,267 @@
+"""
+Restaurant search for the restaurants app.
+Restaurants are indexed on their name, description, city, category names and menu
+item names. On SQLite the index is an FTS5 virtual table (created by migration
+0004_restaurant_search_index) kept in sync by the receivers in models.py, which
+rebuild each touched restaurant's document once per transaction, and results are
+ranked with bm25. Other databases fall back to BasicSearchBackend,
+which filters with icontains lookups and keeps the queryset's ordering.
+
+Dish search across every restaurant uses MenuItemToken, an inverted index from
+name words to menu items, maintained incrementally when menu items are saved.
+
+The backend can be forced with the RESTAURANT_SEARCH_BACKEND setting.
+"""
+
+import re
+import sqlite3
+import threading
+from contextlib import closing
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+# Most results a search returns; the list view paginates within them
+SEARCH_RESULT_LIMIT = 500
+
+# Most menu items a dish search returns
+DISH_RESULT_LIMIT = 100
+
+# Words in dish searches ("paneer tikka near me") that never name a dish
+DISH_STOPWORDS = frozenset({
+    'a', 'an', 'and', 'any', 'around', 'at', 'best', 'by', 'food', 'for', 'from', 'get',
+    'i', 'in', 'me', 'my', 'near', 'nearby', 'of', 'on', 'or', 'order', 'some', 'the',
+    'to', 'want', 'with',
+})
+
+_backend = None
+
+# Restaurants whose search documents are rebuilt when the current transaction commits
+_pending = threading.local()
+
+
+def select_search_backend():
+    """
+    Choose the process-wide search backend. RestaurantsConfig.ready() calls this at
+    startup, so the choice never depends on the state of the database at the first
+    search. FTS5 support is read from the sqlite3 library, the same check migration
+    0004_restaurant_search_index makes before creating the table.
+    """
+    global _backend
+    backend = getattr(settings, 'RESTAURANT_SEARCH_BACKEND', None)
+    if backend:
+        _backend = import_string(backend)()
+    elif SQLiteFTSBackend.is_supported():
+        _backend = SQLiteFTSBackend()
+    else:
+        _backend = BasicSearchBackend()
+    return _backend
+
+
+def get_search_backend():
+    """Return the process-wide search backend."""
+    return _backend or select_search_backend()
+
+
+def _flush_reindex():
+    """Reindex every pending restaurant; the first flush to run at a commit drains the set."""
+    restaurant_ids = getattr(_pending, 'restaurant_ids', None)
+    _pending.restaurant_ids = set()
+    if restaurant_ids:
+        get_search_backend().index_restaurants(sorted(restaurant_ids))
+
+
+def schedule_reindex(restaurant_id):
+    """
+    Rebuild a restaurant's search document when the current transaction commits
+    (straight away outside one). However many categories and menu items a
+    transaction touches, each restaurant is reindexed once.
+
+    Every call registers a flush because Django drops on_commit callbacks on
+    rollback without telling anyone, so a "flush scheduled" flag could outlive its
+    transaction. The later flushes of a commit find nothing pending, and restaurants
+    left pending by a rollback are reindexed, from committed data, at the next one.
+    """
+    if not hasattr(_pending, 'restaurant_ids'):
+        _pending.restaurant_ids = set()
+    _pending.restaurant_ids.add(restaurant_id)
+    transaction.on_commit(_flush_reindex)
+
+
+def tokenize(query):
+    """Split a search query into lowercase word tokens."""
+    return re.findall(r'\w+', query.lower())
+
+
+class BaseSearchBackend:
+    """Interface for restaurant search backends."""
+
+    def search(self, queryset, query, limit=SEARCH_RESULT_LIMIT):
+        """Return up to limit restaurants from queryset matching query, best match first."""
+        raise NotImplementedError
+
+    def index_restaurants(self, restaurant_ids):
+        """Rebuild the search documents of the given restaurants."""
+
+    def remove_restaurants(self, restaurant_ids):
+        """Drop the given restaurants from the index."""
+
+    def rebuild(self):
+        """Rebuild the whole index."""
+
+
+class BasicSearchBackend(BaseSearchBackend):
+    """Unindexed search with icontains lookups, for databases without FTS5."""
+
+    def search(self, queryset, query, limit=SEARCH_RESULT_LIMIT):
+        for token in tokenize(query):
+            queryset = queryset.filter(
+                Q(name__icontains=token) |
+                Q(description__icontains=token) |
+                Q(city__icontains=token) |
+                Q(categories__name__icontains=token) |
+                Q(menu_items__name__icontains=token)
+            )
+        return list(queryset.distinct()[:limit])
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Search backed by an SQLite FTS5 table whose rowid is the restaurant id."""
+
+    table = 'restaurants_restaurant_fts'
+    # bm25 column weights: name, description, city, categories, menu
+    weights = (10.0, 1.0, 2.0, 3.0, 4.0)
+
+    @classmethod
+    def is_supported(cls):
+        """Whether the database is SQLite built with FTS5."""
+        if connection.vendor != 'sqlite':
+            return False
+        with closing(sqlite3.connect(':memory:')) as probe:
+            return bool(probe.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0])
+
+    def build_match(self, query):
+        """
+        Turn free text into an FTS5 query: every token must match and the last one
+        may be a prefix, so results update while the customer is still typing.
+        Tokens are quoted so FTS5 operators in the input are taken literally.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        return ' '.join(f'"{token}"' for token in tokens) + '*'
+
+    def search(self, queryset, query, limit=SEARCH_RESULT_LIMIT):
+        match = self.build_match(query)
+        if match is None:
+            return []
+        # Join (rather than "rowid IN") the queryset so SQLite walks the FTS matches
+        # and probes restaurants by primary key; FTS5 would rerun MATCH per IN value.
+        filter_sql, filter_params = queryset.order_by().values('id').query.sql_with_params()
+        weights = ', '.join(str(weight) for weight in self.weights)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {self.table}.rowid FROM {self.table} '
+                f'JOIN ({filter_sql}) filtered ON filtered.id = {self.table}.rowid '
+                f'WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, {weights}) LIMIT %s',
+                (*filter_params, match, limit),
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        restaurants = queryset.model.objects.in_bulk(ids)
+        return [restaurants[restaurant_id] for restaurant_id in ids if restaurant_id in restaurants]
+
+    def _document_sql(self, where):
+        return (
+            f'INSERT INTO {self.table} (rowid, name, description, city, categories, menu) '
+            'SELECT r.id, r.name, r.description, r.city, '
+            "COALESCE((SELECT group_concat(c.name, ' ') FROM restaurants_category c WHERE c.restaurant_id = r.id), ''), "
+            "COALESCE((SELECT group_concat(m.name, ' ') FROM restaurants_menuitem m WHERE m.restaurant_id = r.id), '') "
+            f'FROM restaurants_restaurant r {where}'
+        )
+
+    def _chunks(self, restaurant_ids, size=500):
+        """Yield (ids, placeholders) batches that stay under SQLite's bind parameter limit."""
+        restaurant_ids = list(restaurant_ids)
+        for start in range(0, len(restaurant_ids), size):
+            chunk = restaurant_ids[start:start + size]
+            yield chunk, ', '.join(['%s'] * len(chunk))
+
+    def index_restaurants(self, restaurant_ids):
+        with connection.cursor() as cursor:
+            for chunk, placeholders in self._chunks(restaurant_ids):
+                cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', chunk)
+                cursor.execute(self._document_sql(f'WHERE r.id IN ({placeholders})'), chunk)
+
+    def remove_restaurants(self, restaurant_ids):
+        with connection.cursor() as cursor:
+            for chunk, placeholders in self._chunks(restaurant_ids):
+                cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', chunk)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(self._document_sql(''))
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+
+
+def dish_tokens(text):
+    """Return the set of dish search tokens in text, without stopwords."""
+    return {
+        token[:50] for token in tokenize(text)
+        if len(token) > 1 and token not in DISH_STOPWORDS
+    }
+
+
+def index_menu_items(menu_items):
+    """Rebuild the dish search tokens of the given menu items."""
+    from .models import MenuItemToken
+
+    menu_items = list(menu_items)
+    if not menu_items:
+        return
+    MenuItemToken.objects.filter(menu_item__in=menu_items).delete()
+    MenuItemToken.objects.bulk_create([
+        MenuItemToken(token=token, menu_item=menu_item)
+        for menu_item in menu_items
+        for token in dish_tokens(menu_item.name)
+    ])
+
+
+def search_dishes(query, city=None, vegetarian=None, min_price=None, max_price=None, limit=DISH_RESULT_LIMIT):
+    """
+    Find available dishes at verified restaurants whose names contain every word of
+    query (the last word may be a prefix). Returns [(restaurant, [menu_item, ...]), ...]
+    with the best rated restaurants first and each restaurant's dishes cheapest first.
+    """
+    from .models import MenuItem, MenuItemToken
+
+    tokens = [token for token in tokenize(query) if len(token) > 1 and token not in DISH_STOPWORDS]
+    if not tokens:
+        return []
+
+    items = MenuItem.objects.filter(is_available=True, restaurant__is_verified=True)
+    for position, token in enumerate(tokens):
+        postings = MenuItemToken.objects.filter(token=token)
+        if position == len(tokens) - 1:
+            # A range on the (token, menu_item) index instead of an unindexable LIKE 'x%'
+            postings = MenuItemToken.objects.filter(token__gte=token, token__lt=token + '\uffff')
+        items = items.filter(id__in=postings.values('menu_item_id'))
+
+    if city:
+        items = items.filter(restaurant__city__iexact=city)
+    if vegetarian is not None:
+        items = items.filter(is_vegetarian=vegetarian)
+    if min_price is not None:
+        items = items.filter(price__gte=min_price)
+    if max_price is not None:
+        items = items.filter(price__lte=max_price)
+
+    items = items.select_related('restaurant').order_by('-restaurant__rating', 'restaurant_id', 'price', 'id')[:limit]
+    results = []
+    for item in items:
+        if not results or results[-1][0].id != item.restaurant_id:
+            results.append((item.restaurant, []))
+        results[-1][1].append(item)
+    return results
@@ -0,0 +1,32 @@
+"""
+Menu write services for the restaurants app.
+Bulk menu changes are applied as single UPDATE statements. Those skip the model
+signals, so each service invalidates the restaurant's cached menu once itself.
+"""
+
+from django.db.models import Q
+from django.utils import timezone
+from .menu_cache import bump_menu_version
+from .models import MenuItem
+
+
+def set_menu_availability(restaurant_id, is_available, item_ids=(), category_ids=()):
+    """
+    Mark a restaurant's menu items available or sold out with one UPDATE: the
+    items in item_ids plus every item in the categories in category_ids. Items of
+    other restaurants are never matched. Returns the number of items changed.
+    """
+    selection = Q()
+    if item_ids:
+        selection |= Q(id__in=item_ids)
+    if category_ids:
+        selection |= Q(category_id__in=category_ids)
+    if not selection:
+        return 0
+
+    updated = MenuItem.objects.filter(selection, restaurant_id=restaurant_id).exclude(
+        is_available=is_available,
+    ).update(is_available=is_available, updated_at=timezone.now())
+    if updated:
+        bump_menu_version(restaurant_id)
+    return updated
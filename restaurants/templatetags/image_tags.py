@@ -0,0 +1,58 @@
+"""
+Template tags for responsive images (see foodcart/images.py).
+
+    {% load image_tags %}
+    {% picture restaurant.image alt=restaurant.name sizes="(min-width: 992px) 33vw, 100vw" class="card-img-top" %}
+    <img src="{% image_rendition item.image 400 %}" srcset="{% image_srcset item.image %}">
+"""
+
+from django import template
+from django.utils.html import format_html, format_html_join
+from foodcart.images import get_renditions
+
+register = template.Library()
+
+
+def _srcset(renditions):
+    return ', '.join(f'{url} {width}w' for width, url in renditions)
+
+
+@register.simple_tag
+def image_srcset(image, format='webp'):
+    """srcset value listing an image's renditions in one format, or '' if there are none."""
+    renditions = get_renditions(image.name) if image else None
+    return _srcset(renditions.get(format, [])) if renditions else ''
+
+
+@register.simple_tag
+def image_rendition(image, width, format='jpeg'):
+    """URL of the smallest rendition at least width pixels wide, falling back to the original."""
+    if not image:
+        return ''
+    renditions = get_renditions(image.name)
+    if not renditions or not renditions.get(format):
+        return image.url
+    candidates = renditions[format]
+    return next((url for rendition_width, url in candidates if rendition_width >= int(width)), candidates[-1][1])
+
+
+@register.simple_tag
+def picture(image, alt='', sizes='100vw', **attrs):
+    """
+    <picture> offering the WebP renditions with a JPEG <img> fallback. Extra keyword
+    arguments become <img> attributes ("class", "style", ...). Images without
+    renditions yet render as a plain <img> of the original file.
+    """
+    if not image:
+        return ''
+    img_attrs = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    renditions = get_renditions(image.name)
+    if not renditions:
+        return format_html('<img src="{}" alt="{}" loading="lazy"{}>', image.url, alt, img_attrs)
+    jpeg = renditions.get('jpeg', [])
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy"{}></picture>',
+        _srcset(renditions.get('webp', [])), sizes,
+        jpeg[-1][1] if jpeg else image.url, _srcset(jpeg), sizes, alt, img_attrs,
+    )
@@ -10,10 +10,14 @@ urlpatterns = [
     # Restaurant browsing
     path('', views.restaurant_list_view, name='restaurants'),
     path('<int:restaurant_id>/', views.restaurant_detail_view, name='restaurant_detail'),
+    path('<int:restaurant_id>/menu.json', views.menu_document_view, name='menu_document'),
+    path('dishes/search/', views.dish_search_view, name='dish_search'),
+    path('nearby/', views.nearby_restaurants_view, name='nearby_restaurants'),
     
     # Restaurant owner features
     path('register/', views.restaurant_registration_view, name='restaurant_registration'),
     path('dashboard/', views.restaurant_dashboard_view, name='restaurant_dashboard'),
+    path('dashboard/orders/feed/', views.restaurant_order_feed_view, name='restaurant_order_feed'),
     path('edit/', views.restaurant_edit_view, name='restaurant_edit'),
     
     # Menu management
@@ -21,7 +25,12 @@ urlpatterns = [
     path('menu/add/', views.add_menu_item_view, name='add_menu_item'),
     path('menu/<int:item_id>/edit/', views.edit_menu_item_view, name='edit_menu_item'),
     path('menu/<int:item_id>/delete/', views.delete_menu_item_view, name='delete_menu_item'),
+    path('menu/import/', views.import_menu_view, name='import_menu'),
+    path('menu/export/', views.export_menu_view, name='export_menu'),
+    path('menu/availability/', views.bulk_menu_availability_view, name='bulk_menu_availability'),
+    path('api/menu/availability/', views.menu_availability_api_view, name='menu_availability_api'),
     
     # Order management for restaurant owners
     path('order/<int:order_id>/status/', views.update_order_status_view, name='restaurant_update_order_status'),
+    path('orders/status/', views.bulk_update_order_status_view, name='restaurant_bulk_update_order_status'),
 ]
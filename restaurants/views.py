@@ -3,84 +3,371 @@ Views for the restaurants app - Restaurant and menu management.
 Handles restaurant listing, menu management, and restaurant dashboard.
 """
 
+import hashlib
+import json
+import math
+from decimal import Decimal, InvalidOperation
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.safestring import mark_safe
+from asgiref.sync import sync_to_async
+from foodcart.conditional import conditional_page, page_etag
+from orders.bestsellers import get_bestsellers
+from orders.events import event_stream, restaurant_channel
+from orders.models import ORDER_STATUS_CHOICES, ORDER_TRANSITIONS
+from orders.services import transition_order, bulk_transition_orders
 from .models import Restaurant, MenuItem, Category
-from .forms import RestaurantRegistrationForm, RestaurantUpdateForm, MenuItemForm, CategoryForm
+from .facets import KnownCountPaginator, get_city_facets, get_facet_totals, get_filtered_count
+from .hours import current_minute_of_week
+from .menu_cache import (
+    get_list_version, get_menu_cache, get_menu_version, menu_document_key, menu_modified_at, menu_page_key,
+    version_modified_at,
+)
+from .menu_io import MenuImportError, import_menu, stream_menu_csv, stream_menu_json
+from .search import get_search_backend, search_dishes
+from .services import set_menu_availability
+from .forms import RestaurantRegistrationForm, RestaurantUpdateForm, MenuItemForm, CategoryForm, MenuImportForm
 from accounts.models import UserProfile
 
+# Seconds an order feed connection stays open before the browser reconnects
+ORDER_FEED_MAX_DURATION = 300
+
+# Seconds a rendered menu stays cached; a menu version bump replaces it sooner
+MENU_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Nearby restaurant search radius, in kilometres
+NEARBY_DEFAULT_KM = 5
+NEARBY_MAX_KM = 50
+
+def _list_etag(request):
+    # "Open now" and "opens soon" results also change with the clock
+    clock = current_minute_of_week() if request.GET.get('hours') else None
+    return page_etag(request, get_list_version(), request.GET.urlencode(), clock)
+
+
+def _list_last_modified(request):
+    if request.GET.get('hours'):
+        return None
+    return version_modified_at(get_list_version())
+
+
+@conditional_page(etag_func=_list_etag, last_modified_func=_list_last_modified)
 def restaurant_list_view(request):
     """
     Display list of all restaurants.
-    Supports filtering by search query and city.
+    Supports filtering by search query, city, pure veg and open restaurants, and by
+    opening hours ("open now" / "opens soon", see restaurants/hours.py).
+    Filter counts come from the precomputed city facets (see restaurants/facets.py).
+    Answers conditional GETs from the restaurant list version without querying.
     """
     restaurants = Restaurant.objects.filter(is_verified=True)
     
     # Search functionality
     search_query = request.GET.get('search', '')
     city_filter = request.GET.get('city', '')
-    
-    if search_query:
-        restaurants = restaurants.filter(
-            Q(name__icontains=search_query) |
-            Q(description__icontains=search_query)
-        )
+    pure_veg = request.GET.get('veg') == '1'
+    open_now = request.GET.get('open') == '1'
+    hours_filter = request.GET.get('hours', '')
     
     if city_filter:
         restaurants = restaurants.filter(city=city_filter)
+    if pure_veg:
+        restaurants = restaurants.filter(is_pure_veg=True)
+    if open_now:
+        restaurants = restaurants.filter(is_open=True)
+    if hours_filter == 'open':
+        restaurants = restaurants.open_now()
+    elif hours_filter == 'soon':
+        restaurants = restaurants.opening_soon().order_by('opens_in', '-rating')
+    else:
+        hours_filter = ''
+    
+    # City facets for the filters and the result count
+    cities = get_city_facets()
+    facet_totals = get_facet_totals(cities, city_filter)
+    
+    count = None
+    if search_query:
+        # Ranked full-text search (see restaurants/search.py) returns a list
+        restaurants = get_search_backend().search(restaurants, search_query)
+    elif not hours_filter:
+        count = get_filtered_count(facet_totals, pure_veg, open_now)
     
     # Pagination
-    paginator = Paginator(restaurants, 12)
+    if count is None:
+        paginator = Paginator(restaurants, 12)
+    else:
+        paginator = KnownCountPaginator(restaurants, 12, count)
     page = request.GET.get('page')
     restaurants = paginator.get_page(page)
     
-    # Get unique cities for filter
-    cities = Restaurant.objects.values_list('city', flat=True).distinct()
-    
     context = {
         'restaurants': restaurants,
         'search_query': search_query,
         'cities': cities,
         'city_filter': city_filter,
+        'pure_veg': pure_veg,
+        'open_now': open_now,
+        'hours_filter': hours_filter,
+        'facet_totals': facet_totals,
     }
     return render(request, 'restaurants/list.html', context)
 
 
+def _detail_etag(request, restaurant_id):
+    return page_etag(request, restaurant_id, get_menu_version(restaurant_id), timezone.localdate())
+
+
+def _detail_last_modified(request, restaurant_id):
+    return menu_modified_at(get_menu_version(restaurant_id), timezone.localdate())
+
+
+@conditional_page(etag_func=_detail_etag, last_modified_func=_detail_last_modified)
 def restaurant_detail_view(request, restaurant_id):
     """
     Display restaurant details and menu.
-    Shows all menu items organized by categories.
+    Shows all menu items organized by categories, with the most ordered items first.
+    The menu is rendered once per menu version and day and served from the cache
+    without database queries until the restaurant, its menu, its reviews or its
+    bestsellers change (see restaurants/menu_cache.py and orders/bestsellers.py).
+    Conditional GETs for an unchanged menu version get a 304 without rendering.
     """
-    restaurant = get_object_or_404(Restaurant, id=restaurant_id, is_verified=True)
-    categories = restaurant.categories.all()
-    menu_items = restaurant.menu_items.filter(is_available=True)
-    reviews = restaurant.reviews.all()[:5]
+    cache = get_menu_cache()
+    key = menu_page_key(restaurant_id, get_menu_version(restaurant_id), timezone.localdate())
+    page = cache.get(key)
+    
+    if page is None:
+        restaurant = get_object_or_404(Restaurant, id=restaurant_id, is_verified=True)
+        categories = restaurant.categories.prefetch_related('items')
+        reviews = restaurant.reviews.select_related('user')[:5]
+        page = {
+            'name': restaurant.name,
+            'html': render_to_string('restaurants/_detail_menu.html', {
+                'restaurant': restaurant,
+                'bestsellers': get_bestsellers(restaurant.id),
+                'categories': categories,
+                'reviews': reviews,
+            }),
+        }
+        cache.set(key, page, MENU_CACHE_TIMEOUT)
     
     context = {
-        'restaurant': restaurant,
-        'categories': categories,
-        'menu_items': menu_items,
-        'reviews': reviews,
+        'restaurant_name': page['name'],
+        'menu_html': mark_safe(page['html']),
     }
     return render(request, 'restaurants/detail.html', context)
 
 
+def _build_menu_document(restaurant_id):
+    """Serialize a restaurant's menu as JSON bytes, or return None if it is not listed."""
+    restaurant = Restaurant.objects.filter(id=restaurant_id, is_verified=True).first()
+    if restaurant is None:
+        return None
+    
+    def item_data(item):
+        return {
+            'id': item.id,
+            'name': item.name,
+            'description': item.description,
+            'price': item.price,
+            'is_vegetarian': item.is_vegetarian,
+            'is_available': item.is_available,
+            'preparation_time': item.preparation_time,
+        }
+    
+    categories = restaurant.categories.prefetch_related('items').order_by('name')
+    document = {
+        'restaurant': {
+            'id': restaurant.id,
+            'name': restaurant.name,
+            'city': restaurant.city,
+            'is_open': restaurant.is_open,
+            'is_pure_veg': restaurant.is_pure_veg,
+            'rating': restaurant.rating,
+            'opening_time': restaurant.opening_time,
+            'closing_time': restaurant.closing_time,
+        },
+        'categories': [
+            {
+                'id': category.id,
+                'name': category.name,
+                'description': category.description,
+                'items': [item_data(item) for item in category.items.all()],
+            }
+            for category in categories
+        ],
+        'uncategorized': [item_data(item) for item in restaurant.menu_items.filter(category__isnull=True)],
+        # Most ordered item ids, best first
+        'bestsellers': [item['id'] for item in get_bestsellers(restaurant.id)],
+    }
+    return json.dumps(document, cls=DjangoJSONEncoder, ensure_ascii=False, sort_keys=True).encode()
+
+
+def menu_document_view(request, restaurant_id):
+    """
+    Restaurant menu as JSON for mobile clients (categories, items, prices, availability).
+    The document is serialized once per menu version and day and cached with a strong
+    ETag of its bytes, so revalidating an unchanged menu costs no database queries.
+    """
+    version = get_menu_version(restaurant_id)
+    today = timezone.localdate()
+    cache = get_menu_cache()
+    key = menu_document_key(restaurant_id, version, today)
+    document = cache.get(key)
+    
+    if document is None:
+        body = _build_menu_document(restaurant_id)
+        if body is None:
+            return JsonResponse({'success': False, 'message': 'Restaurant not found.'}, status=404)
+        document = {'body': body, 'etag': '"%s"' % hashlib.sha256(body).hexdigest()[:32]}
+        cache.set(key, document, MENU_CACHE_TIMEOUT)
+    
+    last_modified = menu_modified_at(version, today)
+    response = get_conditional_response(
+        request, etag=document['etag'], last_modified=int(last_modified.timestamp()),
+    )
+    if response is None:
+        response = HttpResponse(document['body'], content_type='application/json')
+    response['ETag'] = document['etag']
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def _parse_price(value):
+    """Parse an optional price filter; blank means no bound."""
+    if not value:
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        price = None
+    if price is None or not price.is_finite() or price < 0:
+        raise ValueError(f'Invalid price: {value}')
+    return price
+
+
+def _default_search_city(user):
+    """City of the customer's default delivery address, falling back to their profile."""
+    if not user.is_authenticated:
+        return ''
+    city = user.addresses.filter(is_default=True).values_list('city', flat=True).first()
+    if not city:
+        city = UserProfile.objects.filter(user=user).values_list('city', flat=True).first()
+    return city or ''
+
+
+def dish_search_view(request):
+    """
+    Search dishes across every restaurant (AJAX endpoint).
+    Filters by veg, min_price/max_price and city, which defaults to the customer's
+    default address city. Results are grouped by restaurant.
+    """
+    try:
+        query = request.GET.get('q', '').strip()
+        city = request.GET.get('city', '').strip() or _default_search_city(request.user)
+        veg = request.GET.get('veg', '')
+        vegetarian = {'1': True, 'true': True, '0': False, 'false': False}.get(veg.lower())
+        
+        results = search_dishes(
+            query,
+            city=city,
+            vegetarian=vegetarian,
+            min_price=_parse_price(request.GET.get('min_price')),
+            max_price=_parse_price(request.GET.get('max_price')),
+        )
+        
+        return JsonResponse({
+            'success': True,
+            'query': query,
+            'city': city,
+            'restaurants': [
+                {
+                    'id': restaurant.id,
+                    'name': restaurant.name,
+                    'city': restaurant.city,
+                    'rating': float(restaurant.rating),
+                    'url': reverse('restaurant_detail', args=[restaurant.id]),
+                    'dishes': [
+                        {
+                            'id': item.id,
+                            'name': item.name,
+                            'price': float(item.price),
+                            'is_vegetarian': item.is_vegetarian,
+                        }
+                        for item in items
+                    ],
+                }
+                for restaurant, items in results
+            ],
+        })
+    
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)})
+
+
+@login_required(login_url='login')
+def nearby_restaurants_view(request):
+    """
+    Display verified restaurants within a radius of the customer's default address
+    (or ?lat=&lng=), nearest first.
+    """
+    try:
+        radius = float(request.GET.get('km', NEARBY_DEFAULT_KM))
+        if not math.isfinite(radius):
+            raise ValueError('km must be a finite number.')
+        radius = min(max(radius, 0.5), NEARBY_MAX_KM)
+    except ValueError:
+        radius = NEARBY_DEFAULT_KM
+    
+    address = request.user.addresses.filter(latitude__isnull=False).order_by('-is_default', '-created_at').first()
+    try:
+        latitude, longitude = float(request.GET['lat']), float(request.GET['lng'])
+        # float() also accepts inf and nan
+        if not (math.isfinite(latitude) and math.isfinite(longitude)):
+            raise ValueError('Coordinates must be finite numbers.')
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError('Coordinates are out of range.')
+    except (KeyError, ValueError):
+        if address is None:
+            messages.info(request, 'Add a delivery address to see restaurants near you.')
+            return redirect('add_address')
+        latitude, longitude = address.latitude, address.longitude
+    
+    restaurants = Restaurant.objects.filter(is_verified=True).nearby(latitude, longitude, radius)
+    
+    context = {
+        'restaurants': restaurants,
+        'address': address,
+        'radius': radius,
+        'radius_choices': (2, 5, 10, 20),
+    }
+    return render(request, 'restaurants/nearby.html', context)
+
+
 @login_required(login_url='login')
 def restaurant_registration_view(request):
     """
     Restaurant registration view for new restaurant owners.
     """
     # Check if user already has a restaurant
-    if hasattr(request.user, 'restaurant'):
+    if request.account.restaurant_id is not None:
         messages.warning(request, 'You already have a registered restaurant.')
         return redirect('restaurant_dashboard')
     
     # Check if user is a restaurant owner
-    if not hasattr(request.user, 'profile') or request.user.profile.role != 'restaurant_owner':
+    if not request.account.is_restaurant_owner:
         messages.error(request, 'Only restaurant owners can register a restaurant.')
         return redirect('home')
     
@@ -237,29 +524,213 @@ def delete_menu_item_view(request, item_id):
     messages.success(request, 'Menu item deleted successfully!')
     return redirect('restaurant_dashboard')
 
+def _parse_ids(values):
+    """Parse a list of ids from a form or JSON body; raises ValueError."""
+    if not isinstance(values, list):
+        raise ValueError('Expected a list of ids.')
+    return [int(value) for value in values]
+
+
+@login_required(login_url='login')
+@require_http_methods(["POST"])
+def bulk_menu_availability_view(request):
+    """
+    Mark the selected menu items, or whole categories, available or sold out
+    from the dashboard.
+    """
+    restaurant_id = request.account.restaurant_id
+    
+    if restaurant_id is None:
+        messages.error(request, 'You need to register a restaurant first.')
+        return redirect('restaurant_registration')
+    
+    try:
+        item_ids = _parse_ids(request.POST.getlist('item_ids'))
+        category_ids = _parse_ids(request.POST.getlist('category_ids'))
+    except ValueError:
+        item_ids = category_ids = []
+    is_available = request.POST.get('is_available') == 'true'
+    
+    if not item_ids and not category_ids:
+        messages.error(request, 'Select at least one menu item.')
+    else:
+        updated = set_menu_availability(restaurant_id, is_available, item_ids, category_ids)
+        state = 'available' if is_available else 'sold out'
+        messages.success(request, f'{updated} menu item(s) marked {state}.')
+    
+    return redirect('restaurant_dashboard')
+
+
+@login_required(login_url='login')
+@require_http_methods(["POST"])
+def menu_availability_api_view(request):
+    """
+    Set availability for many menu items at once (AJAX endpoint).
+    Expects {"is_available": true|false, "item_ids": [...], "category_ids": [...]};
+    every item listed and every item in the listed categories is changed.
+    """
+    restaurant_id = request.account.restaurant_id
+    if restaurant_id is None:
+        return JsonResponse({'success': False, 'message': 'You need to register a restaurant first.'})
+    
+    try:
+        data = json.loads(request.body)
+        is_available = data.get('is_available')
+        if not isinstance(is_available, bool):
+            raise ValueError('is_available must be true or false.')
+        item_ids = _parse_ids(data.get('item_ids', []))
+        category_ids = _parse_ids(data.get('category_ids', []))
+    except (ValueError, TypeError, AttributeError) as e:
+        return JsonResponse({'success': False, 'message': str(e)})
+    
+    if not item_ids and not category_ids:
+        return JsonResponse({'success': False, 'message': 'No menu items given.'})
+    
+    updated = set_menu_availability(restaurant_id, is_available, item_ids, category_ids)
+    return JsonResponse({'success': True, 'updated': updated, 'is_available': is_available})
+
+
+@login_required(login_url='login')
+def import_menu_view(request):
+    """
+    Import categories and menu items from a CSV or JSON file.
+    Shows a report of what was (or on a preview, would be) added and changed.
+    """
+    restaurant = getattr(request.user, 'restaurant', None)
+
+    if not restaurant:
+        messages.warning(request, 'You need to register a restaurant first.')
+        return redirect('restaurant_registration')
+
+    report = None
+    if request.method == 'POST':
+        form = MenuImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                report = import_menu(
+                    restaurant,
+                    form.cleaned_data['menu_file'],
+                    dry_run=form.cleaned_data['dry_run'],
+                    hide_missing=form.cleaned_data['hide_missing'],
+                )
+            except MenuImportError as e:
+                messages.error(request, str(e))
+            else:
+                if report.errors:
+                    messages.error(request, 'The menu was not imported. Fix the rows below and upload it again.')
+                elif report.applied:
+                    messages.success(request, 'Menu imported successfully!')
+    else:
+        form = MenuImportForm()
+
+    return render(request, 'restaurants/import_menu.html', {'form': form, 'report': report})
+
+
+@login_required(login_url='login')
+def export_menu_view(request):
+    """
+    Download the restaurant's menu as CSV (default) or JSON, in the import format.
+    """
+    restaurant = getattr(request.user, 'restaurant', None)
+
+    if not restaurant:
+        messages.warning(request, 'You need to register a restaurant first.')
+        return redirect('restaurant_registration')
+
+    if request.GET.get('format') == 'json':
+        response = StreamingHttpResponse(stream_menu_json(restaurant), content_type='application/json')
+        extension = 'json'
+    else:
+        response = StreamingHttpResponse(stream_menu_csv(restaurant), content_type='text/csv; charset=utf-8')
+        extension = 'csv'
+    response['Content-Disposition'] = f'attachment; filename="menu-{restaurant.id}.{extension}"'
+    return response
+
+
 @login_required(login_url='login')
 @require_http_methods(["POST"])
 def update_order_status_view(request, order_id):
     """
     Update order status by restaurant owner.
     Allows marking order as preparing, ready for pickup, etc.
+    Only moves allowed by the order state graph are applied.
     """
-    from orders.models import Order
+    restaurant_id = request.account.restaurant_id
     
-    restaurant = getattr(request.user, 'restaurant', None)
-    
-    if not restaurant:
+    if restaurant_id is None:
         messages.error(request, 'You need to register a restaurant first.')
         return redirect('restaurant_registration')
     
-    order = get_object_or_404(Order, id=order_id, restaurant=restaurant)
     new_status = request.POST.get('status')
     
-    if new_status and new_status in dict(Order._meta.get_field('status').choices):
-        order.status = new_status
-        order.save()
-        messages.success(request, f'Order status updated to {order.get_status_display()}!')
+    if new_status not in ORDER_TRANSITIONS:
+        messages.error(request, 'Invalid status.')
+    elif transition_order(order_id, new_status, restaurant_id):
+        messages.success(request, f'Order status updated to {dict(ORDER_STATUS_CHOICES)[new_status]}!')
     else:
+        messages.error(request, 'This order cannot be moved to that status.')
+    
+    return redirect('restaurant_dashboard')
+
+
+@login_required(login_url='login')
+@require_http_methods(["POST"])
+def bulk_update_order_status_view(request):
+    """
+    Move several orders to the same status at once (e.g. confirm every new order).
+    Orders that cannot legally make the move are skipped.
+    """
+    restaurant_id = request.account.restaurant_id
+    
+    if restaurant_id is None:
+        messages.error(request, 'You need to register a restaurant first.')
+        return redirect('restaurant_registration')
+    
+    new_status = request.POST.get('status')
+    try:
+        order_ids = [int(order_id) for order_id in request.POST.getlist('order_ids')]
+    except ValueError:
+        order_ids = []
+    
+    if new_status not in ORDER_TRANSITIONS:
         messages.error(request, 'Invalid status.')
+    elif not order_ids:
+        messages.error(request, 'Select at least one order.')
+    else:
+        changed = bulk_transition_orders(order_ids, new_status, restaurant_id)
+        skipped = len(set(order_ids)) - len(changed)
+        status_display = dict(ORDER_STATUS_CHOICES)[new_status]
+        messages.success(request, f'{len(changed)} order(s) updated to {status_display}.')
+        if skipped:
+            messages.warning(request, f'{skipped} order(s) could not be moved to {status_display}.')
     
-    return redirect('restaurant_dashboard')
\ No newline at end of file
+    return redirect('restaurant_dashboard')
+
+
+def _get_owned_restaurant_id(request):
+    """Return the id of the logged-in owner's restaurant, or None."""
+    return request.account.restaurant_id
+
+
+@login_required(login_url='login')
+async def restaurant_order_feed_view(request):
+    """
+    Live order feed for the owner dashboard (server-sent events).
+    Pushes new-order and status-change events for the owner's restaurant so the
+    dashboard does not need to be reloaded. Needs the ASGI server (foodcart/asgi.py);
+    under WSGI it answers 204, which tells EventSource to stop reconnecting.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    restaurant_id = await sync_to_async(_get_owned_restaurant_id)(request)
+    if restaurant_id is None:
+        return HttpResponseForbidden()
+    
+    response = StreamingHttpResponse(
+        event_stream(restaurant_channel(restaurant_id), ORDER_FEED_MAX_DURATION),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response